@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmark of frame checksums and file transfer verification, no autopilot is needed.
+# Run from the repository root: PYTHONPATH=.:connector python benchmarks/checksum.py
+
+import argparse
+import binascii
+import os
+import time
+
+from proto import Parser
+
+
+def byteCrc(previous, data):
+    # Frame checksum as computed byte by byte before
+    b1, b2 = previous
+    for value in data:
+        b1 = (b1 + value) & 0xFF
+        b2 = (b2 + b1) & 0xFF
+    return (b1, b2)
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmarkFrames(sizes, repeat):
+    print('frame checksum, us per frame')
+    for size in sizes:
+        frame = memoryview(bytearray(os.urandom(size)))
+        if byteCrc((0, 0), frame) != Parser.crc((0, 0), frame):
+            raise Exception()
+
+        count = max(1, repeat // max(size, 1))
+        old = measure(lambda: byteCrc((0, 0), frame), count)
+        new = measure(lambda: Parser.crc((0, 0), frame), count)
+        print(f'{size:6d} bytes: byte loop {old * 1e6:8.2f}, bulk {new * 1e6:8.2f}, x{old / new:.1f}')
+
+
+def benchmarkFile(size, chunkSize):
+    data = bytearray(os.urandom(size))
+    view = memoryview(data)
+
+    # Verification after the transfer, the whole file is read again when the last chunk arrives
+    start = time.perf_counter()
+    whole = binascii.crc32(data) & 0xFFFFFFFF
+    tail = time.perf_counter() - start
+
+    # Running checksum updated as chunks arrive, the last chunk adds only its own length
+    checksum, perChunk = 0, []
+    for position in range(0, size, chunkSize):
+        start = time.perf_counter()
+        checksum = binascii.crc32(view[position:position + chunkSize], checksum)
+        perChunk.append(time.perf_counter() - start)
+    if checksum & 0xFFFFFFFF != whole:
+        raise Exception()
+
+    print(f'file checksum, {size} bytes in chunks of {chunkSize}')
+    print(f'  after transfer: {tail * 1e3:.3f} ms tail latency')
+    print(f'  incremental: {sum(perChunk) * 1e3:.3f} ms in total, {perChunk[-1] * 1e6:.1f} us tail latency')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', dest='sizes', type=int, nargs='+', default=[8, 24, 64, 128, 259],
+            help='frame sizes, bytes')
+    parser.add_argument('--repeat', dest='repeat', type=int, default=1000000, help='bytes checksummed per frame size')
+    parser.add_argument('--file', dest='file', type=int, default=16 * 1024 * 1024, help='file size, bytes')
+    parser.add_argument('--chunk', dest='chunk', type=int, default=48, help='file chunk size, bytes')
+    options = parser.parse_args()
+
+    benchmarkFrames(options.sizes, options.repeat)
+    benchmarkFile(options.file, options.chunk)
+
+
+if __name__ == '__main__':
+    main()
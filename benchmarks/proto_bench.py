@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Micro-benchmark of the PlazLink protocol stack on a synthetic or recorded byte stream, no autopilot is needed.
+# Run from the repository root: PYTHONPATH=.:connector python benchmarks/proto_bench.py --frames 20000
+# Recorded stream, for example a dump of the autopilot TCP port, is replayed with --input dump.bin
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from proto import Component, Message, Messenger, Parser, Protocol, StreamHandler
+
+
+# Telemetry fields of the synthetic component: name, type, flags
+TELEMETRY = (
+        ('latitude', 4, 0x05),
+        ('longitude', 4, 0x05),
+        ('altitude', 10, 0x05),
+        ('speed', 10, 0x01),
+        ('course', 3, 0x01),
+        ('satellites', 6, 0x01),
+        ('status', 8, 0x01),
+        ('mode', 2, 0x03))
+
+COMPONENT_ADDRESS = 3
+
+
+class ReplayStream:
+    ''' Stream without a peer: nothing is received from it, sent data is dropped. '''
+
+    def __init__(self):
+        self.written = 0
+
+    def read(self):
+        time.sleep(0.01)
+        return bytes()
+
+    def write(self, data):
+        self.written += len(data)
+
+
+def randomValue(generator, typeValue):
+    if Protocol.isFloatType(typeValue):
+        return generator.uniform(-1000.0, 1000.0)
+    size = Protocol.typeToSize(typeValue) * 8
+    if Protocol.isSignedType(typeValue):
+        return generator.randrange(-(1 << (size - 1)), 1 << (size - 1))
+    return generator.randrange(0, 1 << size)
+
+
+def makeDescription():
+    fields = [{'field': i, 'type': typeValue, 'size': 1, 'flags': flags, 'name': name, 'scale': 0, 'unit': '',
+            'min': None, 'max': None} for i, (name, typeValue, flags) in enumerate(TELEMETRY)]
+    return {'fields': fields, 'files': [{'file': 0, 'status': 0x07}]}
+
+
+def makeTelemetry(generator):
+    payload = bytes([COMPONENT_ADDRESS, 0])
+    for i, (name, typeValue, flags) in enumerate(TELEMETRY):
+        payload += bytes([i]) + Protocol.pack(typeValue, randomValue(generator, typeValue))
+    return Message.COMPONENT_MESSAGE, payload
+
+
+def makeField(generator):
+    index = generator.randrange(len(TELEMETRY))
+    typeValue = TELEMETRY[index][1]
+    return Message.COMPONENT_FIELD, bytes([COMPONENT_ADDRESS, index, typeValue]) \
+            + Protocol.pack(typeValue, randomValue(generator, typeValue))
+
+
+def makeFieldInfo(generator):
+    index = generator.randrange(len(TELEMETRY))
+    name, typeValue, flags = TELEMETRY[index]
+    limits = Protocol.pack(typeValue, [randomValue(generator, typeValue), randomValue(generator, typeValue)])
+    return Message.COMPONENT_FIELD_INFO_EXT, bytes([COMPONENT_ADDRESS, index, typeValue, 1, flags, 0, len(name)]) \
+            + name.encode() + bytes([1]) + b'm' + limits
+
+
+def makeFileChunk(generator):
+    position = generator.randrange(0, 1 << 20) * 48
+    return Message.COMPONENT_FILE_READ_RESPONSE, Message.FILE_POSITION_LAYOUT.pack(COMPONENT_ADDRESS, 0, position) \
+            + bytes(generator.getrandbits(8) for _ in range(48))
+
+
+def makeFileResult(generator):
+    position = generator.randrange(0, 1 << 20) * 48
+    return Message.COMPONENT_FILE_WRITE_RESPONSE, Message.FILE_RESULT_LAYOUT.pack(COMPONENT_ADDRESS, 0, position, 0)
+
+
+def makeParam(generator):
+    number = generator.randrange(0, 256)
+    name = 'PARAM_{:d}'.format(number).encode().ljust(32, b'\x00')
+    return Message.PARAM, Message.PARAM_LAYOUT.pack(number, generator.uniform(-100.0, 100.0)) + name
+
+
+# Share of each kind of message in the synthetic stream
+MIX = (
+        (makeTelemetry, 60),
+        (makeField, 15),
+        (makeFileChunk, 10),
+        (makeFileResult, 5),
+        (makeParam, 5),
+        (makeFieldInfo, 5))
+
+
+def synthesize(count, seed):
+    generator = random.Random(seed)
+    makers = [maker for maker, weight in MIX for _ in range(weight)]
+    return [Parser.create(*generator.choice(makers)(generator)) for _ in range(count)]
+
+
+def replay(path):
+    with open(path, 'rb') as dump:
+        data = dump.read()
+    return [Parser.create(packet.id, packet.data) for packet in Parser().feed(data)]
+
+
+def outgoing(generator):
+    ''' Return values:
+    Messages -- list of requests the connector sends, one of each kind
+    '''
+    return [
+            {'id': Message.REQ_PARAM, 'number': 5},
+            {'id': Message.PROTOCOL_REQUEST, 'protoMajor': 1, 'protoMinor': 0},
+            {'id': Message.SYSTEM_COMMAND, 'command': 18},
+            {'id': Message.COMPONENT_COUNT_REQUEST},
+            {'id': Message.COMPONENT_INFO_REQUEST, 'component': COMPONENT_ADDRESS},
+            {'id': Message.COMPONENT_FIELD_REQUEST, 'component': COMPONENT_ADDRESS, 'field': 2},
+            {'id': Message.COMPONENT_FIELD, 'component': COMPONENT_ADDRESS, 'field': 2, 'type': 10,
+                    'value': generator.uniform(0.0, 100.0)},
+            {'id': Message.COMPONENT_FIELD_DESCRIBE, 'component': COMPONENT_ADDRESS, 'field': 2},
+            {'id': Message.COMPONENT_FILE_DESCRIBE, 'component': COMPONENT_ADDRESS, 'file': 0, 'flags': 0x03},
+            {'id': Message.COMPONENT_FILE_WRITE, 'component': COMPONENT_ADDRESS, 'file': 0, 'position': 480,
+                    'data': bytes(48)},
+            {'id': Message.COMPONENT_FILE_READ, 'component': COMPONENT_ADDRESS, 'file': 0, 'position': 480,
+                    'length': 192, 'fragment': 48},
+            {'id': Message.PARAM, 'number': 5, 'value': 1.5, 'name': 'PARAM_5'},
+            {'id': Message.GOTO_LOCAL_POINT, 'x': 100, 'y': -200, 'z': 300, 'time': 1000}]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100.0))] if ordered else 0
+
+
+def measure(name, function, items, sizes=None):
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for item in items:
+        begin = clock()
+        function(item)
+        latencies.append(clock() - begin)
+    elapsed = (clock() - start) / 1e9
+
+    # Allocations are traced in a separate pass, tracing slows the code down several times
+    tracemalloc.start()
+    for item in items:
+        function(item)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rate = len(items) / elapsed if elapsed > 0 else 0.0
+    throughput = sum(sizes) / elapsed / 1024 if sizes is not None and elapsed > 0 else None
+    print(f'{name:16s} {len(items):8d} {rate:12.0f}/s '
+          + (f'{throughput:10.1f} KiB/s ' if throughput is not None else ' ' * 17)
+          + f'p50 {percentile(latencies, 50) / 1000:7.2f} us, p99 {percentile(latencies, 99) / 1000:7.2f} us, '
+          f'peak {peak / 1024:8.1f} KiB, retained {retained / 1024:6.1f} KiB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', dest='frames', type=int, default=20000, help='number of synthetic frames')
+    parser.add_argument('--input', dest='input', default=None, help='recorded PlazLink byte stream')
+    parser.add_argument('--chunk', dest='chunk', type=int, default=4096, help='receive buffer size, bytes')
+    parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of the synthetic stream')
+    options = parser.parse_args()
+
+    generator = random.Random(options.seed)
+    frames = replay(options.input) if options.input is not None else synthesize(options.frames, options.seed)
+    if len(frames) == 0:
+        raise Exception()
+    sizes = [len(frame) for frame in frames]
+    packets = Parser().feed(b''.join(frames))
+    stream = b''.join(frames)
+    chunks = [stream[i:i + options.chunk] for i in range(0, len(stream), options.chunk)]
+    print(f'{len(frames)} frames, {len(stream)} bytes, {len(chunks)} receive buffers of {options.chunk} bytes')
+
+    messenger = Messenger(ReplayStream())
+    component = Component(messenger, COMPONENT_ADDRESS)
+    component.loadComponentDescription(makeDescription())
+    messenger.subscribe(component.componentMessageCallback, Message.COMPONENT_MESSAGE, COMPONENT_ADDRESS)
+    telemetry = [makeTelemetry(generator)[1][2:] for _ in range(min(len(frames), 10000))]
+    requests = outgoing(generator) * max(1, len(frames) // 13)
+    values = [(typeValue, randomValue(generator, typeValue)) for typeValue in range(2, 12)] * max(1, len(frames) // 10)
+    encoded = [(typeValue, Protocol.pack(typeValue, value)) for typeValue, value in values]
+
+    try:
+        print(f'{"stage":16s} {"count":>8s} {"rate":>14s} {"throughput":>16s}')
+        legacyParser = Parser()
+        measure('Parser.process', lambda frame: legacyParser.process(frame), frames, sizes)
+        streamParser = Parser()
+        measure('Parser.feed', lambda frame: streamParser.feed(frame), frames, sizes)
+        measure('Message.parse', lambda packet: StreamHandler.inputParsers[packet.id](packet.data),
+                [packet for packet in packets if packet.id in StreamHandler.inputParsers])
+        measure('Message.make', lambda fields: Parser.create(fields['id'],
+                StreamHandler.outputParsers[fields['id']](fields)), requests)
+        measure('Protocol.pack', lambda entry: Protocol.pack(*entry), values)
+        measure('Protocol.unpack', lambda entry: Protocol.unpack(*entry), encoded)
+        measure('Component', component.parseComponentMessagePayload, telemetry)
+        measure('dispatch', messenger.handler.process, frames, sizes)
+        measure('stream', messenger.handler.process, chunks, [len(chunk) for chunk in chunks])
+    finally:
+        messenger.stop()
+
+
+if __name__ == '__main__':
+    main()
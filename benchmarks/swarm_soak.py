@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Soak test of DronePhysics on the in-process kinematic swarm, no autopilot containers are needed.
+# Run from the repository root: PYTHONPATH=.:connector python benchmarks/swarm_soak.py --drones 10000
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from src.Drone import Drone
+from src.DronePhysics import DronePhysics
+from src.KinematicSwarm import KinematicSwarm, KinematicUAV
+from src.Vector import Vector
+from src.СonvertService import EnuFrame
+
+
+def createSwarm(count, spacing, lat, lon, vel_m_c, safe_radius):
+    swarm = KinematicSwarm(realtime=False)
+    swarm.setOrigin(lat, lon)
+
+    # square formation, every drone flies to the mirrored point of the formation
+    side = int(math.ceil(math.sqrt(count)))
+    rows, columns = np.divmod(np.arange(count), side)
+    north, east = rows * spacing, columns * spacing
+    lats, lons, alts = swarm.toGeodetic(north, east, np.zeros(count))
+    indices = swarm.addDrones(lats, lons, alts)
+
+    drones = []
+    for i, index in enumerate(indices):
+        target = Vector(float(east[-1 - i]), float(north[-1 - i]), 25.0)
+        drones.append(Drone(vel_m_c, target, i + 1, safe_radius, True, KinematicUAV(swarm, index=index)))
+    return swarm, drones
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if len(values) else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--drones', dest='drones', type=int, default=10000, help='swarm size')
+    parser.add_argument('--ticks', dest='ticks', type=int, default=600, help='number of 60 Hz ticks')
+    parser.add_argument('--spacing', dest='spacing', type=float, default=3.0, help='formation spacing, m')
+    options = parser.parse_args()
+
+    rate = 60
+    swarm, drones = createSwarm(options.drones, options.spacing, 59.868, 30.567, 1, 5)
+    physics = DronePhysics()
+
+    for drone in drones:
+        drone.uav.control.preflight()
+        drone.uav.control.takeoff()
+    while np.any(swarm.mode == KinematicSwarm.TAKEOFF):
+        swarm.step(1.0 / rate)
+    for drone in drones:
+        drone.blastOff()
+    swarm.step(5.0)
+    print(f'{len(drones)} drones airborne')
+
+    frame = EnuFrame(*swarm.origin)
+    physicsTimes, tickTimes = [], []
+    for tick in range(options.ticks):
+        start = time.perf_counter()
+        for drone, enu in zip(drones, frame.toEnu(*swarm.getLLAs()).tolist()):
+            drone.position.setXYZ(*enu)
+
+        physicsStart = time.perf_counter()
+        velocities = physics.constructVelocityVectors(drones)
+        physicsTimes.append(time.perf_counter() - physicsStart)
+
+        for drone, velocity in zip(drones, velocities):
+            drone.velocity = velocity
+        swarm.step(1.0 / rate)
+        tickTimes.append(time.perf_counter() - start)
+
+        if tick % rate == 0:
+            reached = sum(1 for drone in drones if drone.connected == 2)
+            print(f'tick {tick}: physics {physicsTimes[-1] * 1000:.1f} ms, tick {tickTimes[-1] * 1000:.1f} ms, '
+                  f'reached {reached}/{len(drones)}')
+
+    print(f'physics p50 {percentile(physicsTimes, 50):.1f} ms, p99 {percentile(physicsTimes, 99):.1f} ms')
+    print(f'tick p50 {percentile(tickTimes, 50):.1f} ms, p99 {percentile(tickTimes, 99):.1f} ms, '
+          f'budget {1000 / rate:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
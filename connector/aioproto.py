@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import collections
+import socket
+
+from proto import CommandError, Component, DispatchTable, Field, Hub, Message, Messenger, Parser, Result, StreamHandler
+from proto import debug, listen, verbose
+
+
+class AsyncField(Field):
+    async def readInfo(self):
+        proxyCallback = lambda packet: listen(
+                (
+                        Message.COMPONENT_FIELD_INFO,
+                        Message.COMPONENT_FIELD_INFO_EXT,
+                        Message.COMPONENT_FIELD_ERROR
+                ),
+                packet, self.onFieldInfoReceived)
+        request = {'id': Message.COMPONENT_FIELD_DESCRIBE, 'component': self.component.address, 'field': self.index}
+
+        response = await self.component.messenger.invoke(packet=request, callback=proxyCallback)
+        if response is None:
+            raise CommandError(Result.GENERIC_TIMEOUT)
+        if response['id'] == Message.COMPONENT_FIELD_ERROR:
+            raise CommandError(response['result'])
+
+    async def read(self):
+        proxyCallback = lambda packet: listen((Message.COMPONENT_FIELD, Message.COMPONENT_FIELD_RESPONSE), packet,
+                self.onFieldRead)
+        request = {'id': Message.COMPONENT_FIELD_REQUEST, 'component': self.component.address,
+                'field': self.index, 'type': self.type}
+
+        response = await self.component.messenger.invoke(packet=request, callback=proxyCallback)
+        if response is None:
+            raise CommandError(Result.GENERIC_TIMEOUT)
+        if response['id'] != Message.COMPONENT_FIELD:
+            raise CommandError(response['result'])
+        return response['value']
+
+    async def write(self, value):
+        proxyCallback = lambda packet: listen(Message.COMPONENT_FIELD_RESPONSE, packet,
+                lambda fields: self.onFieldWritten(value, fields))
+        request = {'id': Message.COMPONENT_FIELD, 'component': self.component.address,
+                'field': self.index, 'type': self.type, 'value': value}
+
+        response = await self.component.messenger.invoke(packet=request, callback=proxyCallback)
+        if response is None:
+            raise CommandError(Result.GENERIC_TIMEOUT)
+        if response['result'] != Result.SUCCESS:
+            raise CommandError(response['result'])
+
+
+class AsyncComponent(Component):
+    fieldClass = AsyncField
+
+    async def readInfo(self):
+        proxyCallback = lambda packet: listen(
+                (
+                        Message.COMPONENT_INFO,
+                        Message.COMPONENT_INFO_EXT,
+                        Message.COMPONENT_INFO_ERROR
+                ),
+                packet, self.onComponentInfoReceived)
+        request = {'id': Message.COMPONENT_INFO_REQUEST, 'component': self.address}
+
+        response = await self.messenger.invoke(packet=request, callback=proxyCallback)
+        if response is None:
+            raise CommandError(Result.GENERIC_TIMEOUT)
+        if response['id'] == Message.COMPONENT_INFO_ERROR:
+            raise CommandError(response['result'])
+
+    async def readFieldInfo(self):
+        # All fields are described concurrently, fields after the first failed one are dropped
+        fields = [self.fieldClass(self, i) for i in range(0, self.count)]
+        results = await asyncio.gather(*[field.readInfo() for field in fields], return_exceptions=True)
+
+        for field, result in zip(fields, results):
+            if isinstance(result, Exception):
+                verbose('\tField {:3d} read info failed: {:s}'.format(field.index, str(result)))
+                return False
+            with self.mutex:
+                self.fields[field.index] = field
+                self.onFieldAttached(field)
+        return True
+
+    async def readFileInfo(self, start=0, end=8):
+        streams = [self.fileClass(self, i) for i in list(range(start, end + 1)) + [255]]
+
+        async def describe(stream):
+            proxyCallback = lambda packet: listen((Message.COMPONENT_FILE_INFO, Message.COMPONENT_FILE_INFO_ERROR),
+                    packet, stream.onFileInfoReceived)
+            request = {'id': Message.COMPONENT_FILE_DESCRIBE, 'component': self.address,
+                    'file': stream.index, 'flags': 0x01}
+            return await self.messenger.invoke(packet=request, callback=proxyCallback)
+
+        responses = await asyncio.gather(*[describe(stream) for stream in streams])
+        for stream, response in zip(streams, responses):
+            if response is None:
+                break
+            if response['id'] == Message.COMPONENT_FILE_INFO:
+                with self.mutex:
+                    self.files[stream.index] = stream
+
+    async def writeFields(self, values, force=()):
+        ''' Writes several fields concurrently, values is a list of (name or index, value) pairs.
+        Fields whose value equals the last acknowledged one are skipped unless listed in force.
+        Return values:
+        Count -- number of fields sent
+        '''
+        writes = []
+        for item, value in values:
+            field = self[item]
+            if field is None:
+                raise CommandError(Result.FIELD_NOT_FOUND)
+            if field.written == value and item not in force and field.name not in force:
+                continue
+            writes.append(field.write(value))
+
+        await asyncio.gather(*writes)
+        return len(writes)
+
+
+class AsyncHub(Hub):
+    componentClass = AsyncComponent
+
+    async def connect(self):
+        self.detachComponents()
+
+        try:
+            info = await self.getProtocolInfo()
+            self.version = info[0]
+            self.model = info[1]
+        except:
+            print('error in get protocol info')
+            return
+
+        self.lic = await self.getLicenseInfo()
+        if self.lic is None:
+            verbose('License Info read failed')
+
+        try:
+            await self.getComponentCount()
+        except:
+            print('failed to get component count')
+            return
+
+        await asyncio.gather(*[self.connectComponent(i) for i in range(0, self.count)])
+
+    async def connectComponent(self, address):
+        try:
+            component = self.componentClass(self.messenger, address)
+            await component.readInfo()
+
+            verbose('Component {:d} "{:s}": count {:d}, type {:d}, software {:d}.{:d}.{:d}, hardware {:d}.{:d}, hash {:08X}'.format(
+                    address, component.name, component.count, component.type,
+                    component.swVersion[0], component.swVersion[1], component.swVersion[2],
+                    component.hwVersion[0], component.hwVersion[1], component.hash))
+
+            component.onFieldsChanged = self.onComponentFieldsChanged
+            self.attachComponent(component)
+
+            if not self.loadDescription(component) and await component.readFieldInfo():
+                await component.readFileInfo()
+                self.saveDescription(component)
+        except CommandError as e:
+            verbose('Component {:d} read info failed: {:s}'.format(address, str(e)))
+            print('Component {:d} read info failed: {:s}'.format(address, str(e)))
+
+    async def getProtocolInfo(self, version=(1, 6)):
+        proxyCallback = lambda packet: listen(Message.PROTOCOL_INFO, packet, self.onProtocolInfoReceived)
+        request = {'id': Message.PROTOCOL_REQUEST, 'protoMajor': version[0], 'protoMinor': version[1]}
+
+        response = await self.messenger.invoke(packet=request, callback=proxyCallback)
+        return ((response['protoMajor'], response['protoMinor'], response['firmwareVersion']),
+                response['uavType'], response['uavNumber'])
+
+    async def getLicenseInfo(self):
+        proxyCallback = lambda packet: listen(Message.LICENSE_INFO, packet, self.onLicenseInfoReceived)
+        request = {'id': Message.LICENSE_INFO_REQUEST}
+
+        response = await self.messenger.invoke(packet=request, callback=proxyCallback, retries=4)
+        if response is not None:
+            return {key: response[key] for key in response if key != 'id'}
+        else:
+            return None
+
+    async def getComponentCount(self):
+        proxyCallback = lambda packet: listen(Message.COMPONENT_COUNT, packet, self.onComponentCountReceived)
+        request = {'id': Message.COMPONENT_COUNT_REQUEST}
+
+        response = await self.messenger.invoke(packet=request, callback=proxyCallback)
+        return response['count']
+
+
+class AsyncMessenger(asyncio.Protocol):
+    ''' Messenger on an asyncio transport, requests are coroutines and many of them may wait at once.
+    Responses are matched to requests with the same correlation keys as in Messenger.
+    '''
+
+    class Request:
+        def __init__(self, packet, callback, future):
+            self.packet = packet
+            self.callback = callback
+            self.future = future
+            self.key = Messenger.requestKey(packet)
+            self.queued = False
+            self.response = None
+
+
+    def __init__(self, cache=None, window=16):
+        self.transport = None
+        self.parser = Parser()
+        self.pending = {}
+        self.listeners = DispatchTable()
+        self.window = asyncio.Semaphore(window)
+        self.latency = []
+
+        # Common protocol settings
+        self.defaultRetryCount = 4
+        self.defaultTimeout = 0.25
+
+        self.sent = 0
+        self.hub = AsyncHub(self, cache)
+
+    @staticmethod
+    async def open(networkAddress, networkPort, modemAddress=None, modemPort=None, cache=None, window=16):
+        verbose('Connecting to {}:{}, modem {}:{}'.format(networkAddress, networkPort, modemAddress, modemPort))
+        messenger = AsyncMessenger(cache, window)
+        await asyncio.get_event_loop().create_connection(lambda: messenger, networkAddress, networkPort)
+        if modemAddress is not None and modemPort is not None:
+            messenger.transport.write('{:d}:{:d}\n'.format(modemAddress, modemPort).encode())
+        return messenger
+
+    def __getitem__(self, item):
+        return self.hub[item]
+
+    async def connect(self):
+        await self.hub.connect()
+
+    def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None and sock.type == socket.SOCK_STREAM:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def connection_lost(self, exc):
+        # Waiting requests complete with None as on timeout
+        for queue in list(self.pending.values()):
+            for request in queue:
+                if not request.future.done():
+                    request.future.set_result(None)
+        self.transport = None
+
+    def data_received(self, data):
+        for packet in self.parser.feed(data):
+            if packet.id in StreamHandler.inputParsers:
+                fields = StreamHandler.inputParsers[packet.id](packet.data)
+                debug('RX: ' + str(fields))
+                self.dispatch(fields)
+            else:
+                debug('RX: unknown message, class {:02X}, length {:d}'.format(packet.id, len(packet.data)))
+
+    def dispatch(self, fields):
+        key = Messenger.responseKey(fields)
+        if key is not None:
+            for request in list(self.pending.get(key, ())) + list(self.pending.get(None, ())):
+                if not request.future.done() and request.callback(fields):
+                    request.response = fields
+                    if fields.get('result') == Result.COMMAND_QUEUED and not request.queued:
+                        # Command was queued, keep waiting for deferred answer
+                        request.queued = True
+                    else:
+                        request.future.set_result(fields)
+                    break
+
+        for listener in self.listeners.match(fields):
+            listener(fields)
+
+    def subscribe(self, callback, ident=None, component=None):
+        self.listeners.add(callback, ident, component)
+
+    def forget(self, callback, ident=None, component=None):
+        self.listeners.remove(callback, ident, component)
+
+    def send(self, fields):
+        if 'id' not in fields or fields['id'] not in StreamHandler.outputParsers:
+            # User application tries to send incorrect message
+            raise Exception()
+        if self.transport is None:
+            raise CommandError(Result.GENERIC_TIMEOUT)
+
+        payload = StreamHandler.outputParsers[fields['id']](fields)
+        self.transport.write(Parser.create(fields['id'], payload))
+        self.sent += 1
+        debug('TX: ' + str(fields))
+
+    async def invoke(self, packet, callback=None, retries=None, timeout=None):
+        ''' Sends packet and waits until callback accepts a response.
+        Return values:
+        Response -- accepted response or None after all retries
+        '''
+        if callback is None:
+            self.send(packet)
+            return None
+
+        if retries is None:
+            retries = self.defaultRetryCount
+        if timeout is None:
+            timeout = self.defaultTimeout
+
+        loop = asyncio.get_event_loop()
+        request = AsyncMessenger.Request(packet, callback, loop.create_future())
+
+        async with self.window:
+            self.pending.setdefault(request.key, collections.deque()).append(request)
+            try:
+                for i in range(0, retries):
+                    startTime = loop.time()
+                    self.send(packet)
+                    try:
+                        response = await asyncio.wait_for(asyncio.shield(request.future), timeout)
+                    except asyncio.TimeoutError:
+                        if request.queued:
+                            return request.response
+                        continue
+                    if response is not None:
+                        self.latency = ([loop.time() - startTime] + self.latency)[:100]
+                    return response
+                return None
+            finally:
+                queue = self.pending[request.key]
+                queue.remove(request)
+                if len(queue) == 0:
+                    del self.pending[request.key]
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Emulator of PlazLink autopilots for load tests of the connector, no autopilot binary is needed.
+# Run from the repository root: PYTHONPATH=.:connector python connector/emulator.py --count 100
+# Autopilot i listens on port + i, a drone connects with UAV(tcp='127.0.0.1:57890') like to a real one.
+
+import argparse
+import binascii
+import heapq
+import json
+import math
+import os
+import random
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from proto import Message, Parser, Protocol, Result
+from proto import debug, verbose
+
+
+# Components of a Pioneer autopilot and uids of their descriptions in the repository cache
+DEFAULT_COMPONENTS = (
+        ('UavMonitor', '81c52930ddce9e31b873d204ad75a7af'),
+        ('Ublox', '9864e0c28e0f89e9555d9112a6515980'),
+        ('ManualControl', '76b89482338b4d85639965ccff6caa89'),
+        ('FlightManager', 'c9e403cabc9b901da309310611b9a70e'),
+        ('SensorMonitor', 'c207a10248d70d9cd47e11d14b73256a'))
+
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'caches', 'cache0')
+
+# Fields sent without requests, at the telemetry rate
+DEFAULT_TELEMETRY = (
+        ('Ublox', ('latitude', 'longitude', 'altitude')),
+        ('UavMonitor', ('roll', 'pitch', 'yaw', 'altitude', 'mode')))
+
+
+def loadComponents(directory=DEFAULT_CACHE, components=DEFAULT_COMPONENTS):
+    ''' Return values:
+    Components -- list of component names and descriptions read from the description cache
+    '''
+    descriptions = []
+    for name, uid in components:
+        with open(os.path.join(directory, uid + '.json'), 'rb') as descriptionFile:
+            descriptions.append((name, json.loads(descriptionFile.read().decode())))
+    return descriptions
+
+
+class VirtualComponent:
+    ''' Component with fields and files of a component description, values are kept in memory. '''
+
+    def __init__(self, name, description):
+        self.name = name
+        self.fields = {entry['field']: entry for entry in description['fields']}
+        self.names = {entry['name']: entry['field'] for entry in description['fields']}
+        self.values = {index: VirtualComponent.defaultValue(entry) for index, entry in self.fields.items()}
+        self.files = {entry['file']: bytearray() for entry in description['files']}
+        self.status = {entry['file']: entry['status'] for entry in description['files']}
+
+        # Components with different descriptions have different hashes and so different cache uids
+        self.hash = binascii.crc32(json.dumps(description, sort_keys=True).encode()) & 0xFFFFFFFF
+
+    @staticmethod
+    def defaultValue(entry):
+        if entry['type'] == 1: # char
+            return bytes(entry['size'])
+        value = 0.0 if Protocol.isFloatType(entry['type']) else 0
+        return [value] * entry['size'] if entry['size'] > 1 else value
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __getitem__(self, name):
+        return self.values[self.names[name]]
+
+    def __setitem__(self, name, value):
+        self.values[self.names[name]] = value
+
+    def encode(self, index):
+        entry = self.fields[index]
+        if entry['type'] == 1: # char
+            return bytes(self.values[index])
+        return Protocol.pack(entry['type'], self.values[index])
+
+    def decode(self, index, data):
+        ''' Return values:
+        Result -- result of the field write
+        '''
+        entry = self.fields[index]
+        if entry['flags'] & 0x02 == 0:
+            return Result.FIELD_READ_ONLY
+        if entry['type'] == 1: # char
+            value = bytes(data[:entry['size']]).ljust(entry['size'], b'\x00')
+        else:
+            value = Protocol.unpack(entry['type'], data, entry['size'])
+            if None in value:
+                return Result.FIELD_TYPE_MISMATCH
+            value = value[0] if entry['size'] == 1 else list(value)
+        self.values[index] = value
+        return Result.SUCCESS
+
+
+class VirtualAutopilot:
+    ''' Answers PlazLink requests like an autopilot with the given components.
+    Requests are handled synchronously, each one produces a list of response frames as (id, payload) pairs.
+    '''
+
+    PROTOCOL_MAJOR, PROTOCOL_MINOR = 1, 6
+    FIRMWARE_VERSION = 100
+    UAV_TYPE = 12
+
+    def __init__(self, number, components, position=(59.868, 30.567, 0.0), params=40, telemetry=DEFAULT_TELEMETRY):
+        self.number = number
+        self.components = [VirtualComponent(name, description) for name, description in components]
+        self.params = [('PARAM_{:d}'.format(i), float(i)) for i in range(0, params)]
+        self.counts = {}
+
+        self.telemetryFields = []
+        for name, fields in telemetry:
+            component = self.component(name)
+            if component is not None:
+                self.telemetryFields.append((self.components.index(component),
+                        [component.names[field] for field in fields if field in component]))
+
+        gnss = self.component('Ublox')
+        if gnss is not None:
+            gnss['latitude'] = int(position[0] * 1e7)
+            gnss['longitude'] = int(position[1] * 1e7)
+            gnss['altitude'] = int(position[2] * 1e3)
+            for name, value in (('status', 3), ('satTotal', 16), ('satGps', 10), ('satGlonass', 6)):
+                if name in gnss:
+                    gnss[name] = value
+
+    def component(self, name):
+        for component in self.components:
+            if component.name == name:
+                return component
+        return None
+
+    def handle(self, ident, payload):
+        ''' Return values:
+        Frames -- list of response frames, empty for unknown and malformed requests
+        '''
+        self.counts[ident] = self.counts.get(ident, 0) + 1
+        handler = VirtualAutopilot.handlers.get(ident)
+        if handler is None:
+            debug('Autopilot {:d}: unknown message {:02X}'.format(self.number, ident))
+            return []
+        try:
+            return handler(self, payload)
+        except (IndexError, KeyError, struct.error):
+            debug('Autopilot {:d}: malformed message {:02X}'.format(self.number, ident))
+            return []
+
+    def telemetry(self):
+        frames = []
+        for address, indices in self.telemetryFields:
+            component = self.components[address]
+            payload = b''.join(bytes([index]) + component.encode(index) for index in indices)
+            frames.append((Message.COMPONENT_MESSAGE, bytes([address, 0]) + payload))
+        return frames
+
+    def onProtocolRequest(self, payload):
+        return [(Message.PROTOCOL_INFO, Message.PROTOCOL_INFO_LAYOUT.pack(VirtualAutopilot.PROTOCOL_MAJOR,
+                VirtualAutopilot.PROTOCOL_MINOR, VirtualAutopilot.FIRMWARE_VERSION, VirtualAutopilot.UAV_TYPE,
+                self.number))]
+
+    def onLicenseInfoRequest(self, payload):
+        return [(Message.LICENSE_INFO, bytes(16) + Message.LICENSE_INFO_LAYOUT.pack(0, 0, 0, 0, 0, 0, 0, 1)
+                + bytes(32))]
+
+    def onSystemCommand(self, payload):
+        return [(Message.SYSTEM_COMMAND_RESPONSE, bytes([payload[0], Result.SUCCESS]))]
+
+    def onComponentCountRequest(self, payload):
+        return [(Message.COMPONENT_COUNT, bytes([len(self.components)]))]
+
+    def onComponentInfoRequest(self, payload):
+        address = payload[0]
+        if address >= len(self.components):
+            return [(Message.COMPONENT_INFO_ERROR, bytes([address, Result.COMPONENT_NOT_FOUND]))]
+        component = self.components[address]
+        name = component.name.encode()
+        return [(Message.COMPONENT_INFO_EXT, Message.COMPONENT_INFO_EXT_LAYOUT.pack(address, 1, len(component.fields),
+                1, 0, 0, 1, 0, component.hash, len(name)) + name)]
+
+    def onComponentFieldDescribe(self, payload):
+        address, index = payload[0], payload[1]
+        if address >= len(self.components):
+            return [(Message.COMPONENT_FIELD_ERROR, bytes([address, index, Result.COMPONENT_NOT_FOUND]))]
+        entry = self.components[address].fields.get(index)
+        if entry is None:
+            return [(Message.COMPONENT_FIELD_ERROR, bytes([address, index, Result.FIELD_NOT_FOUND]))]
+
+        name, unit = entry['name'].encode(), entry['unit'].encode()
+        header = struct.pack('<BBBBBb', address, index, entry['type'], entry['size'], entry['flags'], entry['scale'])
+        if entry['type'] == 1 or entry['min'] is None or entry['max'] is None:
+            limits = bytes(2 * entry['size'] * Protocol.typeToSize(entry['type']))
+        else:
+            limits = [entry['min'], entry['max']] if entry['size'] == 1 else list(entry['min']) + list(entry['max'])
+            limits = Protocol.pack(entry['type'], limits)
+        return [(Message.COMPONENT_FIELD_INFO_EXT, header + bytes([len(name)]) + name + bytes([len(unit)]) + unit
+                + limits)]
+
+    def onComponentFieldRequest(self, payload):
+        address, index = payload[0], payload[1]
+        if address >= len(self.components):
+            return [(Message.COMPONENT_FIELD_RESPONSE, bytes([address, index, Result.COMPONENT_NOT_FOUND]))]
+        component = self.components[address]
+        if index not in component.fields:
+            return [(Message.COMPONENT_FIELD_RESPONSE, bytes([address, index, Result.FIELD_NOT_FOUND]))]
+        return [(Message.COMPONENT_FIELD, bytes([address, index, component.fields[index]['type']])
+                + component.encode(index))]
+
+    def onComponentField(self, payload):
+        address, index, typeValue = payload[0], payload[1], payload[2]
+        if address >= len(self.components):
+            result = Result.COMPONENT_NOT_FOUND
+        elif index not in self.components[address].fields:
+            result = Result.FIELD_NOT_FOUND
+        elif self.components[address].fields[index]['type'] != typeValue:
+            result = Result.FIELD_TYPE_MISMATCH
+        else:
+            result = self.components[address].decode(index, bytes(payload[3:]))
+        return [(Message.COMPONENT_FIELD_RESPONSE, bytes([address, index, result]))]
+
+    def file(self, address, index):
+        if address >= len(self.components):
+            return None
+        return self.components[address].files.get(index)
+
+    def onComponentFileDescribe(self, payload):
+        address, index = payload[0], payload[1]
+        data = self.file(address, index)
+        if data is None:
+            return [(Message.COMPONENT_FILE_INFO_ERROR, bytes([address, index, Result.FILE_NOT_FOUND]))]
+        return [(Message.COMPONENT_FILE_INFO, Message.FILE_INFO_LAYOUT.pack(address, index,
+                self.components[address].status[index], len(data), binascii.crc32(data) & 0xFFFFFFFF))]
+
+    def onComponentFileRead(self, payload):
+        address, index, position, length, fragment = Message.FILE_READ_LAYOUT.unpack_from(payload)
+        data = self.file(address, index)
+        if data is None:
+            return [(Message.COMPONENT_FILE_READ_ERROR, Message.FILE_RESULT_LAYOUT.pack(address, index, position,
+                    Result.FILE_NOT_FOUND))]
+        if position >= len(data) or fragment == 0:
+            return [(Message.COMPONENT_FILE_READ_ERROR, Message.FILE_RESULT_LAYOUT.pack(address, index, position,
+                    Result.FILE_POSITION_ERROR))]
+
+        frames = []
+        end = min(position + length, len(data))
+        while position < end:
+            chunk = data[position:min(position + fragment, end)]
+            frames.append((Message.COMPONENT_FILE_READ_RESPONSE, Message.FILE_POSITION_LAYOUT.pack(address, index,
+                    position) + chunk))
+            position += len(chunk)
+        return frames
+
+    def onComponentFileWrite(self, payload):
+        address, index, position = Message.FILE_POSITION_LAYOUT.unpack_from(payload)
+        chunk = payload[Message.FILE_POSITION_LAYOUT.size:]
+        data = self.file(address, index)
+
+        if data is None:
+            result = Result.FILE_NOT_FOUND
+        elif len(chunk) == 0:
+            # Empty chunk at zero restarts the write, at the end or at 0xFFFFFFFF finalizes it
+            if position == 0:
+                del data[:]
+            result = Result.SUCCESS if position in (0, len(data), 0xFFFFFFFF) else Result.FILE_POSITION_ERROR
+        elif position <= len(data):
+            # Chunks are committed in order, already written ones may be written again
+            data[position:position + len(chunk)] = chunk
+            result = Result.SUCCESS
+        else:
+            result = Result.FILE_POSITION_ERROR
+        return [(Message.COMPONENT_FILE_WRITE_RESPONSE, Message.FILE_RESULT_LAYOUT.pack(address, index, position,
+                result))]
+
+    def param(self, number):
+        name, value = self.params[number]
+        return (Message.PARAM, Message.PARAM_LAYOUT.pack(number, value) + name.encode().ljust(32, b'\x00'))
+
+    def onReqParam(self, payload):
+        number = payload[0]
+        if number >= len(self.params):
+            return [(Message.PARAM_INFO, bytes([len(self.params)]))]
+        return [self.param(number)]
+
+    def onParam(self, payload):
+        number, value = Message.PARAM_LAYOUT.unpack_from(payload)
+        if number >= len(self.params):
+            return [(Message.PARAM_INFO, bytes([len(self.params)]))]
+        self.params[number] = (self.params[number][0], value)
+        return [self.param(number)]
+
+    def onGoToPoint(self, payload):
+        fields = Message.POINT_LAYOUT.unpack_from(payload)
+        gnss = self.component('Ublox')
+        if gnss is not None:
+            # The drone arrives at once, altitude is sent in centimeters and kept in millimeters
+            gnss['latitude'], gnss['longitude'], gnss['altitude'] = fields[1], fields[2], fields[3] * 10
+        return [(Message.GO_TO_POINT_RESPONSE, bytes([fields[0]]))]
+
+    handlers = {
+            Message.PROTOCOL_REQUEST:         onProtocolRequest,
+            Message.LICENSE_INFO_REQUEST:     onLicenseInfoRequest,
+            Message.SYSTEM_COMMAND:           onSystemCommand,
+            Message.COMPONENT_COUNT_REQUEST:  onComponentCountRequest,
+            Message.COMPONENT_INFO_REQUEST:   onComponentInfoRequest,
+            Message.COMPONENT_FIELD_DESCRIBE: onComponentFieldDescribe,
+            Message.COMPONENT_FIELD_REQUEST:  onComponentFieldRequest,
+            Message.COMPONENT_FIELD:          onComponentField,
+            Message.COMPONENT_FILE_DESCRIBE:  onComponentFileDescribe,
+            Message.COMPONENT_FILE_READ:      onComponentFileRead,
+            Message.COMPONENT_FILE_WRITE:     onComponentFileWrite,
+            Message.REQ_PARAM:                onReqParam,
+            Message.PARAM:                    onParam,
+            Message.GO_TO_POINT_V2:           onGoToPoint
+    }
+
+
+class Peer:
+    ''' Client of a virtual autopilot: a TCP connection or a UDP sender address. '''
+
+    def __init__(self, emulator, autopilot, sock, address=None):
+        self.emulator = emulator
+        self.autopilot = autopilot
+        self.socket = sock
+        self.address = address
+        self.parser = Parser()
+        self.outgoing = bytearray()
+        self.writing = False
+        self.closed = False
+
+    def send(self, data):
+        if self.closed:
+            return
+        if self.address is not None:
+            try:
+                self.socket.sendto(data, self.address)
+            except OSError:
+                pass
+            return
+
+        self.outgoing += data
+        self.flush()
+
+    def flush(self):
+        try:
+            count = self.socket.send(self.outgoing)
+            del self.outgoing[:count]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.emulator.disconnect(self)
+            return
+
+        # Rest of the data is sent when the socket becomes writable
+        writing = len(self.outgoing) > 0
+        if writing != self.writing:
+            self.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.emulator.selector.modify(self.socket, events, self.onEvent)
+
+    def onEvent(self, sock, mask):
+        if mask & selectors.EVENT_WRITE:
+            self.flush()
+        if mask & selectors.EVENT_READ and not self.closed:
+            try:
+                data = self.socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = None
+            if not data:
+                self.emulator.disconnect(self)
+            else:
+                self.emulator.onReceive(self, data)
+
+
+class Emulator:
+    ''' Virtual autopilots on consecutive TCP or UDP ports, all of them are served by one thread.
+    Responses are delayed by latency and each response frame is dropped with probability loss.
+    TCP autopilots accept any number of connections, UDP autopilots answer to the sender address.
+    '''
+
+    def __init__(self, count=1, host='127.0.0.1', port=0, datagram=False, latency=0.0, loss=0.0, telemetryRate=0.0,
+            components=None, origin=(59.868, 30.567), spacing=3.0, seed=None):
+        self.latency = latency
+        self.loss = loss
+        self.telemetryRate = telemetryRate
+        self.random = random.Random(seed)
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.sequence = 0
+        self.terminate = False
+        self.thread = None
+
+        components = components if components is not None else loadComponents()
+        self.autopilots = [VirtualAutopilot(i + 1, components, Emulator.gridPosition(origin, spacing, i, count))
+                for i in range(0, count)]
+        self.peers = {autopilot: [] for autopilot in self.autopilots}
+        self.datagramPeers = {}
+        self.sockets = []
+        self.ports = []
+
+        for i, autopilot in enumerate(self.autopilots):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM if datagram else socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, port + i if port != 0 else 0))
+            sock.setblocking(False)
+            if datagram:
+                callback = lambda sock, mask, autopilot=autopilot: self.onDatagram(sock, autopilot)
+            else:
+                sock.listen(64)
+                callback = lambda sock, mask, autopilot=autopilot: self.onAccept(sock, autopilot)
+            self.selector.register(sock, selectors.EVENT_READ, callback)
+            self.sockets.append(sock)
+            self.ports.append(sock.getsockname()[1])
+
+            if telemetryRate > 0:
+                # Telemetry of different autopilots is spread over the period
+                self.schedule(time.time() + self.random.random() / telemetryRate,
+                        lambda autopilot=autopilot: self.onTelemetry(autopilot))
+
+    @staticmethod
+    def gridPosition(origin, spacing, index, count):
+        # Autopilots stand in a square grid with the first one at the origin
+        side = int(math.ceil(math.sqrt(count)))
+        north, east = (index // side) * spacing, (index % side) * spacing
+        latitude = origin[0] + north / 111320.0
+        longitude = origin[1] + east / (111320.0 * math.cos(math.radians(origin[0])))
+        return (latitude, longitude, 0.0)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.terminate = True
+        if self.thread is not None:
+            self.thread.join()
+        for peers in self.peers.values():
+            for peer in list(peers):
+                self.disconnect(peer)
+        for sock in self.sockets:
+            self.selector.unregister(sock)
+            sock.close()
+        self.selector.close()
+
+    def schedule(self, deadline, callback):
+        # Sequence keeps timers with equal deadlines in order
+        self.sequence += 1
+        heapq.heappush(self.timers, (deadline, self.sequence, callback))
+
+    def run(self):
+        while not self.terminate:
+            now = time.time()
+            while len(self.timers) > 0 and self.timers[0][0] <= now:
+                heapq.heappop(self.timers)[2]()
+
+            timeout = min(max(self.timers[0][0] - now, 0.0), 0.1) if len(self.timers) > 0 else 0.1
+            for key, mask in self.selector.select(timeout):
+                key.data(key.fileobj, mask)
+
+    def onAccept(self, sock, autopilot):
+        try:
+            connection, address = sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        connection.setblocking(False)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+        peer = Peer(self, autopilot, connection)
+        self.selector.register(connection, selectors.EVENT_READ, peer.onEvent)
+        self.peers[autopilot].append(peer)
+        verbose('Autopilot {:d}: connection from {}:{}'.format(autopilot.number, *address))
+
+    def onDatagram(self, sock, autopilot):
+        try:
+            data, address = sock.recvfrom(65535)
+        except (BlockingIOError, InterruptedError, ConnectionError):
+            return
+        peer = self.datagramPeers.get((sock, address))
+        if peer is None:
+            peer = Peer(self, autopilot, sock, address)
+            self.datagramPeers[(sock, address)] = peer
+            self.peers[autopilot].append(peer)
+            verbose('Autopilot {:d}: datagrams from {}:{}'.format(autopilot.number, *address))
+        self.onReceive(peer, data)
+
+    def disconnect(self, peer):
+        if peer.closed:
+            return
+        peer.closed = True
+        self.peers[peer.autopilot].remove(peer)
+        if peer.address is None:
+            self.selector.unregister(peer.socket)
+            peer.socket.close()
+            verbose('Autopilot {:d}: connection closed'.format(peer.autopilot.number))
+        else:
+            del self.datagramPeers[(peer.socket, peer.address)]
+
+    def onReceive(self, peer, data):
+        frames = []
+        for packet in peer.parser.feed(data):
+            frames += peer.autopilot.handle(packet.id, packet.data)
+        self.reply(peer, frames)
+
+    def reply(self, peer, frames):
+        data = b''.join(Parser.create(ident, payload) for ident, payload in frames if self.random.random() >= self.loss)
+        if len(data) == 0:
+            return
+        if self.latency > 0:
+            self.schedule(time.time() + self.latency, lambda: peer.send(data))
+        else:
+            peer.send(data)
+
+    def onTelemetry(self, autopilot):
+        if len(self.peers[autopilot]) > 0:
+            frames = autopilot.telemetry()
+            for peer in self.peers[autopilot]:
+                self.reply(peer, frames)
+        self.schedule(time.time() + 1.0 / self.telemetryRate, lambda: self.onTelemetry(autopilot))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', dest='count', type=int, default=1, help='number of autopilots')
+    parser.add_argument('--host', dest='host', default='127.0.0.1', help='listening address')
+    parser.add_argument('--port', dest='port', type=int, default=57890, help='port of the first autopilot')
+    parser.add_argument('--udp', dest='udp', action='store_true', help='serve UDP instead of TCP')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.0, help='response delay, s')
+    parser.add_argument('--loss', dest='loss', type=float, default=0.0, help='response frame loss probability')
+    parser.add_argument('--telemetry', dest='telemetry', type=float, default=10.0, help='telemetry rate, Hz')
+    parser.add_argument('--cache', dest='cache', default=DEFAULT_CACHE, help='component description cache')
+    options = parser.parse_args()
+
+    emulator = Emulator(count=options.count, host=options.host, port=options.port, datagram=options.udp,
+            latency=options.latency, loss=options.loss, telemetryRate=options.telemetry,
+            components=loadComponents(options.cache))
+    print('{:d} autopilots on {:s} ports {:d}..{:d}'.format(options.count, 'UDP' if options.udp else 'TCP',
+            emulator.ports[0], emulator.ports[-1]))
+    try:
+        emulator.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
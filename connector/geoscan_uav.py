@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import proto
+import threading
+import time
 import weakref
 
 
@@ -34,9 +36,12 @@ class Handler:
 
         self.uav().messenger.hub.onFieldsChanged = self.on_fields_changed
         self.watchers = []
+        self.listeners = []
 
     def on_fields_changed(self, device, fields):
         device_object = self.uav().messenger.hub[device]
+        for listener in self.listeners:
+            listener(device_object, fields)
         if device_object.name == self.name:
             if len(fields) > 0 and device_object[fields[0]].name == 'event':
                 # Read event number
@@ -59,6 +64,53 @@ class Handler:
                 break
 
 
+class Telemetry:
+    # Latest values of the fields pushed by a component in COMPONENT_MESSAGE, no requests are sent
+    def __init__(self, uav, name='Ublox', fields=('latitude', 'longitude', 'altitude')):
+        self.uav = weakref.ref(uav)
+        self.name = name
+        self.fields = fields
+        self.values = {}
+        self.timestamps = {}
+        self.mutex = threading.Lock()
+
+        self.uav().handler.listeners.append(self.on_fields_changed)
+
+    def on_fields_changed(self, device, fields):
+        if device is None or device.name != self.name:
+            return
+
+        timestamp = time.monotonic()
+        with self.mutex:
+            for index in fields:
+                field = device[index]
+                if field is not None and field.name in self.fields:
+                    self.values[field.name] = field.value
+                    self.timestamps[field.name] = timestamp
+
+    def snapshot(self):
+        ''' Returns tuple of two elements when every field was received or None:
+        (values, timestamp) -- field values in order of self.fields, time.monotonic() of the oldest one
+        '''
+        with self.mutex:
+            if len(self.timestamps) < len(self.fields):
+                return None
+            values = tuple(self.values[name] for name in self.fields)
+            timestamp = min(self.timestamps.values())
+        return (values, timestamp)
+
+    def age(self):
+        snapshot = self.snapshot()
+        return time.monotonic() - snapshot[1] if snapshot is not None else None
+
+    def position(self, max_age=None):
+        snapshot = self.snapshot()
+        if snapshot is None or (max_age is not None and time.monotonic() - snapshot[1] > max_age):
+            return None
+        lat, lon, alt = snapshot[0]
+        return (lat / 1e7, lon / 1e7, alt / 1e3)
+
+
 class Gpio:
     def __init__(self, uav):
         self.uav = weakref.ref(uav)
@@ -99,12 +151,12 @@ class GlobalNavSystem:
     def __init__(self, uav):
         self.uav = uav
         self.name = 'Ublox'
+        hub = self.uav().messenger.hub
+        self.coordinates = tuple(hub.field(self.name, name) for name in ('latitude', 'longitude', 'altitude'))
 
     def position(self):
         try:
-            lat = self.uav().messenger.hub[self.name]['latitude'].read()
-            lon = self.uav().messenger.hub[self.name]['longitude'].read()
-            alt = self.uav().messenger.hub[self.name]['altitude'].read()
+            lat, lon, alt = (field.read() for field in self.coordinates)
             return (lat[0] / 1e7, lon[0] / 1e7, alt[0] / 1e3)
         except:
             return None
@@ -306,18 +358,18 @@ class Control:
             return True
             
     def go_manual_22mode(self, northSpeed, eastSpeed, downSpeed, yawSpeed, interval):
+        speeds = ('northSpeed', 'eastSpeed', 'downSpeed', 'yawSpeed')
         try:
-            self.uav().messenger.hub['ManualControl']['speed'].write(0)
-            self.uav().messenger.hub['ManualControl']['interval'].write(interval)
-            self.uav().messenger.hub['ManualControl']['mode'].write(5)
-            self.uav().messenger.hub['ManualControl']['northSpeed'].write(northSpeed)
-            self.uav().messenger.hub['ManualControl']['eastSpeed'].write(eastSpeed)
-            self.uav().messenger.hub['ManualControl']['downSpeed'].write(downSpeed)
-            self.uav().messenger.hub['ManualControl']['yawSpeed'].write(yawSpeed)
-            self.uav().messenger.hub['ManualControl']['altitude'].write(0)
-            # self.uav().messenger.hub['ManualControl']['speed'].write(0)
-            # self.uav().messenger.hub['ManualControl']['interval'].write(interval)
-            # self.uav().messenger.hub['ManualControl']['mode'].write(5)
+            # settings are sent again only when changed, the speeds refresh the command every time
+            self.uav().messenger.hub['ManualControl'].writeFields([
+                    ('speed', 0),
+                    ('interval', interval),
+                    ('mode', 5),
+                    ('northSpeed', northSpeed),
+                    ('eastSpeed', eastSpeed),
+                    ('downSpeed', downSpeed),
+                    ('yawSpeed', yawSpeed),
+                    ('altitude', 0)], force=speeds, priority=proto.Priority.CONTROL)
         except:
             return False
         return True
@@ -370,6 +422,7 @@ class UAV:
         self.gpio = Gpio(self)
         self.led = Led(self)
         self.handler = Handler(self)
+        self.telemetry = Telemetry(self)
 
         # proto.debugEnabled = True
         # proto.verboseEnabled = True
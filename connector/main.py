@@ -1,30 +1,24 @@
 import asyncio
 import time
+import numpy as np
 import websockets
 
 from src.Drone import Drone
 from src.DronePhysics import DronePhysics
 from src.ConnectService import ConnectService
-from src.СonvertService import ConvertService
+from src.СonvertService import EnuFrame
 from src.DockerService.DockerService import runDocker
+from src.KinematicSwarm import KinematicSwarm, KinematicUAV
 from src.TestData import getTestData
 
 
-def addNeighbors(drones):
-    for drone1 in drones:
-        for drone2 in drones:
-            if drone1 != drone2:
-                drone1.neighbors.append(drone2)
-
-
-def createDrones(vel_m_c, targets: []) -> []:
+def createDrones(vel_m_c, targets: [], uavs: [] = None) -> []:
     drones = []
     safe_radius = 5
     drone_id = 1
-    for target in targets:
-        drones.append(Drone(vel_m_c, target, drone_id, safe_radius, True))
+    for i, target in enumerate(targets):
+        drones.append(Drone(vel_m_c, target, drone_id, safe_radius, True, uavs[i] if uavs is not None else None))
         drone_id += 1
-    addNeighbors(drones)
     return drones
 
 
@@ -39,9 +33,9 @@ def main():
         number = 0
         while True:
             timeStamp1 = time.time_ns() // 1000000
-            for drone in drones:
-                lat, lon, alt = drone.getLLA()
-                drone.position.setXYZ(*ConvertService.geodetic2enu(lat, lon, alt, lat0, lon0, alt0))
+            lla = np.array([drone.getLLA() for drone in drones])
+            for drone, enu in zip(drones, frame.toEnu(lla[:, 0], lla[:, 1], lla[:, 2]).tolist()):
+                drone.position.setXYZ(*enu)
 
             data = []
             for i in drones:
@@ -58,8 +52,7 @@ def main():
                 if drones[int(drone_id)].connected != 2:
                     drones[int(drone_id)].connected = not drones[int(drone_id)].connected
 
-            for drone in drones:
-                new_velocity = physics.constructVelocityVector(drone)
+            for drone, new_velocity in zip(drones, physics.constructVelocityVectors(drones)):
                 drone.velocity = new_velocity
             timeStamp2 = time.time_ns() // 1000000
             if timeStamp2 - timeStamp1 >= 0:
@@ -67,14 +60,22 @@ def main():
 
     # ---------------------------------------------------main------------------------------------------
     testNumber = 4
+    headless = False  # in-process kinematic drones instead of Docker autopilots
     testPositions, testTargets = getTestData(testNumber)
-    # --- run Docker images ---
-    runDocker(testPositions)
-    time.sleep(10)  # waiting for containers to load
+    if headless:
+        swarm = KinematicSwarm()
+        uavs = [KinematicUAV(swarm, lat, lon) for lat, lon in testPositions]
+        delays = (0, 0, swarm.takeoffAltitude / swarm.takeoffSpeed)
+    else:
+        # --- run Docker images ---
+        runDocker(testPositions)
+        time.sleep(10)  # waiting for containers to load
+        uavs, delays = None, None
 
     vel_m_c = 1
-    drones = createDrones(vel_m_c, testTargets)
-    lat0, lon0, alt0 = ConnectService.connectDrones(drones)
+    drones = createDrones(vel_m_c, testTargets, uavs)
+    lat0, lon0, alt0 = ConnectService.connectDrones(drones, delays)
+    frame = EnuFrame(lat0, lon0, alt0)
     climb(drones)
     physics = DronePhysics()
 
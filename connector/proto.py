@@ -2,17 +2,24 @@
 # -*- coding: utf-8 -*-
 
 import binascii
+import collections
+import concurrent.futures
 import copy
 import hashlib
+import heapq
 import json
 import os
 import math
+import mmap
+import selectors
 import serial
 import socket
 import struct
 import sys
+import tempfile
 import threading
 import time
+import zlib
 
 debugEnabled, verboseEnabled = False, False
 textMutex = threading.Lock()
@@ -52,7 +59,7 @@ def listen(ident, fields, fn=None):
 
 
 class SerialStream:
-    def __init__(self, dev, rate):
+    def __init__(self, dev, rate, bufferSize=4096):
         self.socket = serial.Serial()
         self.socket.port     = dev
         self.socket.baudrate = rate
@@ -61,6 +68,7 @@ class SerialStream:
         self.socket.xonxoff  = False
         self.socket.timeout  = 0.01
         self.version = sys.version_info[0]
+        self.bufferSize = bufferSize
         try:
             self.socket.open()
         except serial.SerialException:
@@ -72,7 +80,8 @@ class SerialStream:
 
     def read(self):
         try:
-            data = self.socket.read()
+            # Everything already received or a single byte with timeout
+            data = self.socket.read(min(max(self.socket.in_waiting, 1), self.bufferSize))
             return bytearray(data) if self.version == 2 else data
         except serial.SerialException:
             print('Serial port error')
@@ -83,13 +92,12 @@ class SerialStream:
 
 
 class NetworkStream:
-    def __init__(self, networkAddress, networkPort, modemAddress=None, modemPort=None):
+    def __init__(self, networkAddress, networkPort, modemAddress=None, modemPort=None, bufferSize=65536, timeout=0.1):
         try:
             verbose('Connecting to {}:{}, modem {}:{}'.format(networkAddress, networkPort,
                     modemAddress, modemPort))
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((networkAddress, networkPort))
-            self.socket.settimeout(0.1)
             self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
             if modemAddress is not None and modemPort is not None:
                 self.socket.sendall('{:d}:{:d}\n'.format(modemAddress, modemPort).encode())
@@ -98,42 +106,89 @@ class NetworkStream:
             exit()
         self.version = sys.version_info[0]
 
+        # Data is received into one preallocated buffer, read() waits for readiness up to timeout
+        self.buffer = bytearray(bufferSize)
+        self.view = memoryview(self.buffer)
+        self.timeout = timeout
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ)
+
     def __del__(self):
+        self.selector.close()
         self.socket.close()
 
+    def fileno(self):
+        return self.socket.fileno()
+
     def read(self):
+        ''' Returns received data or an empty string on timeout,
+        returned memoryview is valid until the next call.
+        '''
         try:
-            data = self.socket.recv(64)
-            return bytes(data) if self.version == 2 else data
+            if len(self.selector.select(self.timeout)) == 0:
+                return ''
         except:
             return ''
+        data = self.receive()
+        return data if data is not None else ''
+
+    def receive(self):
+        ''' Returns data already received without waiting, None when the connection is closed '''
+        try:
+            count = self.socket.recv_into(self.buffer)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return ''
+        except OSError:
+            return None
+        return self.view[:count] if count > 0 else None
 
     def write(self, data):
         self.socket.sendall(data)
 
 class DatagramStream:
-    def __init__(self, networkAddress, networkPort, modemAddress=None, modemPort=None):
+    def __init__(self, networkAddress, networkPort, modemAddress=None, modemPort=None, bufferSize=65535, timeout=0.1):
         try:
-            verbose('Udp {:s}:{:d}, modem {:d}:{:d}'.format(networkAddress, networkPort,
+            verbose('Udp {:s}:{:d}, modem {}:{}'.format(networkAddress, networkPort,
                     modemAddress, modemPort))
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.socket.bind(("0.0.0.0", networkPort))
-            self.socket.settimeout(0.1)
         except:
             print('Network connection failed')
             exit()
         self.version = sys.version_info[0]
         self.address = (networkAddress,networkPort)
 
+        # Buffer holds the largest UDP datagram, so datagrams are never truncated
+        self.buffer = bytearray(bufferSize)
+        self.view = memoryview(self.buffer)
+        self.timeout = timeout
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ)
+
     def __del__(self):
+        self.selector.close()
         self.socket.close()
 
+    def fileno(self):
+        return self.socket.fileno()
+
     def read(self):
         try:
-            data, address = self.socket.recvfrom(64)
-            return bytes(data) if self.version == 2 else data
+            if len(self.selector.select(self.timeout)) == 0:
+                return ''
         except:
             return ''
+        data = self.receive()
+        return data if data is not None else ''
+
+    def receive(self):
+        try:
+            count, address = self.socket.recvfrom_into(self.buffer)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return ''
+        except OSError:
+            return None
+        return self.view[:count]
 
     def write(self, data):
         self.socket.sendto(data, self.address)
@@ -160,6 +215,7 @@ class Parser:
     def __init__(self):
         self.reset()
         self.counter = Parser.Counter()
+        self.buffer = bytearray()
 
     def reset(self):
         self.state = Parser.State.SYNC
@@ -213,6 +269,45 @@ class Parser:
 
         return len(data)
 
+    def feed(self, data):
+        ''' Parses a whole receive buffer, incomplete packet at the end is kept until the next call.
+        Return values:
+        Packets -- list of received packets with correct checksum
+        '''
+        if len(data) == 0:
+            # Streams return an empty string on timeout
+            return []
+
+        # Received data is appended to the tail of the previous call, streams may reuse their buffers
+        self.buffer += data
+        data = self.buffer
+
+        packets = []
+        view = memoryview(data)
+        size, position = len(data), 0
+
+        while True:
+            start = data.find(b'pl', position)
+            if start < 0:
+                # Last byte may be the first byte of the sync sequence
+                position = max(size - 1, position) if size > 0 and data[-1] == 0x70 else size
+                break
+            if start + 4 > size or start + 6 + data[start + 3] > size:
+                position = start
+                break
+
+            end = start + 6 + data[start + 3]
+            if Parser.crc((0, 0), view[start + 2:end - 2]) == (data[end - 2], data[end - 1]):
+                self.counter.received += 1
+                packets.append(Parser.Packet(data[start + 2], bytearray(view[start + 4:end - 2])))
+            else:
+                self.counter.errors += 1
+            position = end
+
+        view.release()
+        del self.buffer[:position]
+        return packets
+
     @staticmethod
     def create(ident, data):
         if len(data) > 255:
@@ -221,13 +316,19 @@ class Parser:
         checksum = Parser.crc((0, 0), bytearray([ident, len(data)]) + data)
         return 'pl'.encode() + bytearray([ident, len(data)]) + data + bytearray(checksum)
 
+    # Longest block for which Adler-32 sums started from 8-bit sums stay below its modulus
+    crcBlock = 21
+
     @staticmethod
     def crc(previous, data):
-        b1, b2 = previous
-        for value in data:
-            b1 = (b1 + value) & 0xFF
-            b2 = (b2 + b1) & 0xFF
-        return (b1, b2)
+        # Adler-32 keeps the same two running sums modulo 65521, blocks are short enough to never wrap
+        value = previous[1] << 16 | previous[0]
+        if len(data) <= Parser.crcBlock:
+            value = zlib.adler32(data, value)
+        else:
+            for position in range(0, len(data), Parser.crcBlock):
+                value = zlib.adler32(data[position:position + Parser.crcBlock], value & 0xFF00FF)
+        return (value & 0xFF, (value >> 16) & 0xFF)
 
 
 class Message:
@@ -268,6 +369,22 @@ class Message:
     GO_TO_POINT_RESPONSE           = 0x4F
     GOTO_LOCAL_POINT               = 0x50
 
+    # Fixed parts of message payloads, formats are compiled once
+    BYTE                      = struct.Struct('B')
+    BYTE_PAIR                 = struct.Struct('BB')
+    BYTE_TRIPLE               = struct.Struct('BBB')
+    PARAM_LAYOUT              = struct.Struct('<Bf')
+    PROTOCOL_INFO_LAYOUT      = struct.Struct('<BBHBI')
+    LICENSE_INFO_LAYOUT       = struct.Struct('<IIIIHHHB')
+    COMPONENT_INFO_LAYOUT     = struct.Struct('<BBBBHIB')
+    COMPONENT_INFO_EXT_LAYOUT = struct.Struct('<BBBBBIBBIB')
+    FILE_INFO_LAYOUT          = struct.Struct('<BBBII')
+    FILE_POSITION_LAYOUT      = struct.Struct('<BBI')
+    FILE_READ_LAYOUT          = struct.Struct('<BBIHB')
+    FILE_RESULT_LAYOUT        = struct.Struct('<BBIB')
+    LOCAL_POINT_LAYOUT        = struct.Struct('iiiI')
+    POINT_LAYOUT              = struct.Struct('<BiiihBBHHHH')
+
     def __init__(self, value):
         self.value = value
 
@@ -277,15 +394,15 @@ class Message:
 
     @staticmethod
     def makeReqParam(fields):
-        return struct.pack('B', fields['number'])
+        return Message.BYTE.pack(fields['number'])
 
     @staticmethod
     def makeProtocolRequest(fields):
-        return struct.pack('BB', fields['protoMajor'], fields['protoMinor'])
+        return Message.BYTE_PAIR.pack(fields['protoMajor'], fields['protoMinor'])
 
     @staticmethod
     def makeSystemCommand(fields):
-        return struct.pack('B', fields['command'])
+        return Message.BYTE.pack(fields['command'])
 
     @staticmethod
     def makeLicenseInfoRequest(fields):
@@ -297,52 +414,53 @@ class Message:
 
     @staticmethod
     def makeComponentInfoRequest(fields):
-        return struct.pack('B', fields['component'])
+        return Message.BYTE.pack(fields['component'])
 
     @staticmethod
     def makeComponentFieldRequest(fields):
-        return struct.pack('BB', fields['component'], fields['field'])
+        return Message.BYTE_PAIR.pack(fields['component'], fields['field'])
 
     @staticmethod
     def makeComponentField(fields):
-        payload = struct.pack('BBB', fields['component'], fields['field'], fields['type'])
+        payload = Message.BYTE_TRIPLE.pack(fields['component'], fields['field'], fields['type'])
         payload += Protocol.pack(fields['type'], fields['value'])
         return payload
 
     @staticmethod
     def makeComponentFieldDescribe(fields):
-        return struct.pack('BB', fields['component'], fields['field'])
+        return Message.BYTE_PAIR.pack(fields['component'], fields['field'])
 
     @staticmethod
     def makeComponentFileDescribe(fields):
-        return struct.pack('BBB', fields['component'], fields['file'], fields['flags'])
+        return Message.BYTE_TRIPLE.pack(fields['component'], fields['file'], fields['flags'])
 
     @staticmethod
     def makeComponentFileWrite(fields):
-        return struct.pack('<BBI', fields['component'], fields['file'], fields['position']) + fields['data']
+        return Message.FILE_POSITION_LAYOUT.pack(fields['component'], fields['file'], fields['position']) \
+                + fields['data']
 
     @staticmethod
     def makeComponentFileRead(fields):
-        return struct.pack('<BBIHB', fields['component'], fields['file'], fields['position'],
+        return Message.FILE_READ_LAYOUT.pack(fields['component'], fields['file'], fields['position'],
                 fields['length'], fields['fragment'])
 
     @staticmethod
     def makeParam(fields):
-        payload = struct.pack('<Bf', fields['number'], fields['value'])
+        payload = Message.PARAM_LAYOUT.pack(fields['number'], fields['value'])
         payload += fields['name'].encode() + bytes([0] * (32 - len(fields['name'])))
         return payload
 
     @staticmethod
     def makeComponentRawData(fields):
-        return struct.pack('B', fields['component']) + fields['payload']
+        return Message.BYTE.pack(fields['component']) + fields['payload']
 
     @staticmethod
     def makeGotoLocalPoint(fields):
-        return struct.pack('iiiI', fields['x'], fields['y'], fields['z'], fields['time'])
+        return Message.LOCAL_POINT_LAYOUT.pack(fields['x'], fields['y'], fields['z'], fields['time'])
 
     @staticmethod
     def makeGoToPointV2(fields):
-        return struct.pack('<BiiihBBHHHH',
+        return Message.POINT_LAYOUT.pack(
                 fields['sequence'],
                 fields['latitude'],
                 fields['longitude'],
@@ -366,8 +484,7 @@ class Message:
     def parseParam(data):
         fields = {}
         fields['id'] = Message.PARAM
-        fields['number'] = data[0]
-        fields['value'] = struct.unpack('<f', data[1:5])[0]
+        fields['number'], fields['value'] = Message.PARAM_LAYOUT.unpack_from(data)
 
         nameChunk = data[5:37]
         nameChunk = nameChunk[0:nameChunk.find(0)]
@@ -378,11 +495,8 @@ class Message:
     def parseProtocolInfo(data):
         fields = {}
         fields['id'] = Message.PROTOCOL_INFO
-        fields['protoMajor'] = data[0]
-        fields['protoMinor'] = data[1]
-        fields['firmwareVersion'] = struct.unpack('<H', data[2:4])[0]
-        fields['uavType'] = data[4]
-        fields['uavNumber'] = struct.unpack('<I', data[5:9])[0]
+        (fields['protoMajor'], fields['protoMinor'], fields['firmwareVersion'], fields['uavType'],
+                fields['uavNumber']) = Message.PROTOCOL_INFO_LAYOUT.unpack_from(data)
         return fields
 
     @staticmethod
@@ -390,14 +504,9 @@ class Message:
         fields = {}
         fields['id'] = Message.LICENSE_INFO
         fields['uuid'] = data[0:16]
-        fields['timestamp'] = struct.unpack('<I', data[16:20])[0]
-        fields['startTime'] = struct.unpack('<I', data[20:24])[0]
-        fields['endTime'] = struct.unpack('<I', data[24:28])[0]
-        fields['zones'] = struct.unpack('<I', data[28:32])[0]
-        fields['license'] = struct.unpack('<H', data[32:34])[0]
-        fields['launches'] = struct.unpack('<H', data[34:36])[0]
-        fields['launchesLimit'] = struct.unpack('<H', data[36:38])[0]
-        fields['active'] = data[38]
+        (fields['timestamp'], fields['startTime'], fields['endTime'], fields['zones'], fields['license'],
+                fields['launches'], fields['launchesLimit'], fields['active']) = \
+                Message.LICENSE_INFO_LAYOUT.unpack_from(data, 16)
         fields['sign'] = data[39:71]
         fields['payload'] = data[:38]
         return fields
@@ -429,13 +538,8 @@ class Message:
     def parseComponentInfo(data):
         fields = {}
         fields['id'] = Message.COMPONENT_INFO
-        fields['component'] = data[0]
-        fields['type'] = data[1]
-        fields['size'] = data[2]
-        fields['minor'] = data[3]
-        fields['revision'] = struct.unpack('<H', data[4:6])[0]
-        fields['hash'] = struct.unpack('<I', data[6:10])[0]
-        nameLength = data[10]
+        (fields['component'], fields['type'], fields['size'], fields['minor'], fields['revision'],
+                fields['hash'], nameLength) = Message.COMPONENT_INFO_LAYOUT.unpack_from(data)
         fields['name'] = data[11:11 + nameLength].decode('utf-8')
         return fields
 
@@ -443,16 +547,9 @@ class Message:
     def parseComponentInfoExt(data):
         fields = {}
         fields['id'] = Message.COMPONENT_INFO_EXT
-        fields['component'] = data[0]
-        fields['type'] = data[1]
-        fields['count'] = data[2]
-        fields['swMajor'] = data[3]
-        fields['swMinor'] = data[4]
-        fields['swRevision'] = struct.unpack('<I', data[5:9])[0]
-        fields['hwMajor'] = data[9]
-        fields['hwMinor'] = data[10]
-        fields['hash'] = struct.unpack('<I', data[11:15])[0]
-        nameLength = data[15]
+        (fields['component'], fields['type'], fields['count'], fields['swMajor'], fields['swMinor'],
+                fields['swRevision'], fields['hwMajor'], fields['hwMinor'], fields['hash'], nameLength) = \
+                Message.COMPONENT_INFO_EXT_LAYOUT.unpack_from(data)
         fields['name'] = data[16:16 + nameLength].decode('utf-8')
         return fields
 
@@ -500,7 +597,7 @@ class Message:
         fields['unit'] = data[position + 1:position + 1 + unitLength].decode('utf-8')
         position += 1 + unitLength
 
-        fields['min'], fields['max'] = Protocol.unpack(fields['type'], data[position:], 2)
+        fields['min'], fields['max'] = Protocol.unpack(fields['type'], data, 2, position)
 
         return fields
 
@@ -537,11 +634,11 @@ class Message:
         position += 1 + unitLength
 
         if fields['size'] > 1:
-            minMaxValues = Protocol.unpack(fields['type'], data[position:], 2 * fields['size'])
+            minMaxValues = Protocol.unpack(fields['type'], data, 2 * fields['size'], position)
             fields['min'] = tuple(minMaxValues[0:fields['size']])
             fields['max'] = tuple(minMaxValues[fields['size']:2 * fields['size']])
         else:
-            fields['min'], fields['max'] = Protocol.unpack(fields['type'], data[position:], 2)
+            fields['min'], fields['max'] = Protocol.unpack(fields['type'], data, 2, position)
 
         return fields
 
@@ -555,7 +652,7 @@ class Message:
 
         try:
             count = int((len(data) - 3) / Protocol.typeToSize(fields['type']))
-            fields['value'] = Protocol.unpack(fields['type'], data[3:], count)
+            fields['value'] = Protocol.unpack(fields['type'], data, count, 3)
         except:
             fields['value'] = None
 
@@ -565,11 +662,8 @@ class Message:
     def parseComponentFileInfo(data):
         fields = {}
         fields['id'] = Message.COMPONENT_FILE_INFO
-        fields['component'] = data[0]
-        fields['file'] = data[1]
-        fields['status'] = data[2]
-        fields['size'] = struct.unpack('<I', data[3:7])[0]
-        fields['checksum'] = struct.unpack('<I', data[7:11])[0]
+        (fields['component'], fields['file'], fields['status'], fields['size'],
+                fields['checksum']) = Message.FILE_INFO_LAYOUT.unpack_from(data)
         return fields
 
     @staticmethod
@@ -585,30 +679,24 @@ class Message:
     def parseComponentFileWriteResponse(data):
         fields = {}
         fields['id'] = Message.COMPONENT_FILE_WRITE_RESPONSE
-        fields['component'] = data[0]
-        fields['file'] = data[1]
-        fields['position'] = struct.unpack('<I', data[2:6])[0]
-        fields['result'] = data[6]
+        fields['component'], fields['file'], fields['position'], fields['result'] = \
+                Message.FILE_RESULT_LAYOUT.unpack_from(data)
         return fields
 
     @staticmethod
     def parseComponentFileReadResponse(data):
         fields = {}
         fields['id'] = Message.COMPONENT_FILE_READ_RESPONSE
-        fields['component'] = data[0]
-        fields['file'] = data[1]
-        fields['position'] = struct.unpack('<I', data[2:6])[0]
-        fields['data'] = data[6:]
+        fields['component'], fields['file'], fields['position'] = Message.FILE_POSITION_LAYOUT.unpack_from(data)
+        fields['data'] = memoryview(data)[6:]
         return fields
 
     @staticmethod
     def parseComponentFileReadError(data):
         fields = {}
         fields['id'] = Message.COMPONENT_FILE_READ_ERROR
-        fields['component'] = data[0]
-        fields['file'] = data[1]
-        fields['position'] = struct.unpack('<I', data[2:6])[0]
-        fields['result'] = data[6]
+        fields['component'], fields['file'], fields['position'], fields['result'] = \
+                Message.FILE_RESULT_LAYOUT.unpack_from(data)
         return fields
 
     @staticmethod
@@ -718,6 +806,15 @@ class UavType:
         return UavType.NAMES[self.value] if self.value in UavType.NAMES else 'Undefined'
 
 
+class Priority:
+    # Control requests are never held back by the request window,
+    # normal requests are sent ahead of bulk transfers
+    CONTROL = 0
+    NORMAL  = 1
+    BULK    = 2
+    COUNT   = 3
+
+
 class Protocol:
     SYSTEM_COMMANDS = {
             1: 'Start baro calibration',
@@ -785,6 +882,18 @@ class Protocol:
 
             return output[0] if len(output) == 1 else output
 
+    # Compiled formats by (type, count)
+    codecs = {}
+
+    @staticmethod
+    def codec(typeValue, count=1):
+        key = (typeValue, count)
+        codec = Protocol.codecs.get(key)
+        if codec is None:
+            codec = struct.Struct('<{:d}{:s}'.format(count, Protocol.typeToFormat(typeValue)))
+            Protocol.codecs[key] = codec
+        return codec
+
     @staticmethod
     def typeToFormat(typeValue):
         # Bool values are unsupported by struct package
@@ -812,25 +921,24 @@ class Protocol:
                 11: 'double'}[typeValue]
 
     @staticmethod
-    def unpack(typeValue, data, count=1):
+    def unpack(typeValue, data, count=1, offset=0):
         if typeValue in (0, 1): # bool or char
-            if count > len(data):
-                return tuple((None for i in range(0, count)))
+            if offset + count > len(data):
+                return (None,) * count
 
             if typeValue == 0: # bool
-                return tuple([data[i] != 0 for i in range(0, count)])
+                return tuple([data[i] != 0 for i in range(offset, offset + count)])
             else: # char
-                return tuple([chr(data[i]) for i in range(0, count)])
+                return tuple([chr(data[i]) for i in range(offset, offset + count)])
 
         try:
-            typeSize = Protocol.typeToSize(typeValue)
-            if len(data) >= count * typeSize:
-                typeFormat = '<' + ('' if count == 1 else str(count)) + Protocol.typeToFormat(typeValue)
-                return tuple(struct.unpack(typeFormat, data[0:typeSize * count])[0:count])
+            codec = Protocol.codec(typeValue, count)
+            if len(data) - offset >= codec.size:
+                return codec.unpack_from(data, offset)
             else:
-                return tuple((None for i in range(0, count)))
+                return (None,) * count
         except:
-            return tuple((None for i in range(0, count)))
+            return (None,) * count
 
     @staticmethod
     def pack(typeValue, value, count=1):
@@ -848,14 +956,217 @@ class Protocol:
                 return bytes([1 if entry else 0 for entry in package])
             else:
                 # Exception during typeToFormat will mean an error in message preparation
-                typeFormat = '<{:d}{:s}'.format(count, Protocol.typeToFormat(typeValue))
+                return Protocol.codec(typeValue, count).pack(*package)
+
+
+class TimerWheel:
+    ''' Hashed timer wheel: timers are kept in slots by their expiration tick,
+    arming and cancelling a timer costs O(1) regardless of the timer count.
+    '''
+
+    class Timer:
+        def __init__(self, tick, callback):
+            self.tick = tick
+            self.callback = callback
+            self.slot = None
 
-                if typeValue in (10, 11):
-                    # Float and double
-                    return struct.pack(typeFormat, *package)
+
+    def __init__(self, resolution=0.005, size=512):
+        self.resolution = resolution
+        self.size = size
+        self.slots = [set() for i in range(0, size)]
+        self.current = int(time.time() / resolution)
+        self.count = 0
+        self.mutex = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def arm(self, deadline, callback):
+        with self.mutex:
+            timer = TimerWheel.Timer(max(int(math.ceil(deadline / self.resolution)), self.current + 1), callback)
+            timer.slot = timer.tick % self.size
+            self.slots[timer.slot].add(timer)
+            self.count += 1
+        return timer
+
+    def cancel(self, timer):
+        with self.mutex:
+            if timer.slot is not None:
+                self.slots[timer.slot].discard(timer)
+                timer.slot = None
+                self.count -= 1
+
+    def nextTick(self):
+        # Time of the next slot, None when there are no timers
+        return (self.current + 1) * self.resolution if self.count > 0 else None
+
+    def advance(self, now):
+        ''' Removes expired timers and returns their callbacks '''
+        due = []
+        with self.mutex:
+            target = int(now / self.resolution)
+            # Every slot is visited at most once even after a long pause
+            for tick in range(self.current + 1, min(target, self.current + self.size) + 1):
+                slot = self.slots[tick % self.size]
+                expired = [timer for timer in slot if timer.tick <= target]
+                for timer in expired:
+                    slot.discard(timer)
+                    timer.slot = None
+                    due.append(timer.callback)
+                self.count -= len(expired)
+            self.current = max(self.current, target)
+        return due
+
+
+class Reactor:
+    ''' One I/O thread for many streams: it receives and parses data of all registered stream handlers
+    and runs request timers, long requests of all messengers are executed by a shared worker pool.
+    '''
+
+    sharedInstance = None
+    sharedMutex = threading.Lock()
+
+    def __init__(self, workers=8):
+        self.selector = selectors.DefaultSelector()
+        self.mutex = threading.Lock()
+        self.changes = []
+        self.wheel = TimerWheel()
+        self.wakeup = 0.0
+
+        # Other threads interrupt select() through a socket pair
+        self.waker, self.wakee = socket.socketpair()
+        self.waker.setblocking(False)
+        self.wakee.setblocking(False)
+        self.selector.register(self.wakee, selectors.EVENT_READ, None)
+
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def shared():
+        with Reactor.sharedMutex:
+            if Reactor.sharedInstance is None:
+                Reactor.sharedInstance = Reactor()
+            return Reactor.sharedInstance
+
+    def wake(self):
+        try:
+            self.waker.send(b'\0')
+        except OSError:
+            # Buffer is full, the loop is going to wake up anyway
+            pass
+
+    def register(self, handler):
+        with self.mutex:
+            self.changes.append((True, handler))
+        self.wake()
+
+    def unregister(self, handler):
+        with self.mutex:
+            self.changes.append((False, handler))
+        self.wake()
+
+    def schedule(self, deadline, callback):
+        ''' Calls callback() on the I/O thread at deadline, returns the timer for cancel() '''
+        timer = self.wheel.arm(deadline, callback)
+        with self.mutex:
+            earlier = deadline < self.wakeup
+        if earlier:
+            self.wake()
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None:
+            self.wheel.cancel(timer)
+
+    def execute(self, fn, *args):
+        return self.pool.submit(fn, *args)
+
+    def isCurrentThread(self):
+        return threading.current_thread() is self.thread
+
+    def applyChanges(self):
+        with self.mutex:
+            changes, self.changes = self.changes, []
+
+        for register, handler in changes:
+            try:
+                if register:
+                    self.selector.register(handler.stream, selectors.EVENT_READ, handler)
                 else:
-                    # Signed and unsigned integers
-                    return struct.pack(typeFormat, *package)
+                    self.selector.unregister(handler.stream)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def run(self):
+        while True:
+            self.applyChanges()
+
+            with self.mutex:
+                now = time.time()
+                nextTick = self.wheel.nextTick()
+                self.wakeup = nextTick if nextTick is not None else now + 1.0
+                timeout = max(self.wakeup - now, 0.0)
+
+            for key, events in self.selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while self.wakee.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    try:
+                        key.data.receive()
+                    except Exception as e:
+                        debug('Stream handler failed: {:s}'.format(str(e)))
+
+            for callback in self.wheel.advance(time.time()):
+                try:
+                    callback()
+                except Exception as e:
+                    debug('Timer callback failed: {:s}'.format(str(e)))
+
+
+class DispatchTable:
+    ''' Message callbacks indexed by message id and component address.
+    Callbacks subscribed without id receive every message, without address every message with this id.
+    '''
+
+    def __init__(self):
+        self.routes = {}
+        self.mutex = threading.Lock()
+
+    @staticmethod
+    def keys(ident, component):
+        idents = ident if isinstance(ident, (tuple, list)) else (ident,)
+        return [(entry, component if entry is not None else None) for entry in idents]
+
+    def add(self, callback, ident=None, component=None):
+        with self.mutex:
+            for key in DispatchTable.keys(ident, component):
+                # Entries are replaced, not modified, so lookups need no lock
+                entries = self.routes.get(key, ())
+                if callback not in entries:
+                    self.routes[key] = entries + (callback,)
+
+    def remove(self, callback, ident=None, component=None):
+        with self.mutex:
+            for key in DispatchTable.keys(ident, component):
+                entries = self.routes.get(key, ())
+                if callback in entries:
+                    entries = tuple(entry for entry in entries if entry != callback)
+                    if len(entries) > 0:
+                        self.routes[key] = entries
+                    else:
+                        del self.routes[key]
+
+    def match(self, fields):
+        ident = fields['id']
+        return self.routes.get((None, None), ()) + self.routes.get((ident, None), ()) \
+                + self.routes.get((ident, fields.get('component')), ())
 
 
 class StreamHandler:
@@ -903,10 +1214,10 @@ class StreamHandler:
             Message.GOTO_LOCAL_POINT:         Message.makeGotoLocalPoint
     }
 
-    def __init__(self, stream):
+    def __init__(self, stream, reactor=None):
         self.parser = Parser()
         self.stream = stream
-        self.callbacks = []
+        self.callbacks = DispatchTable()
 
         self.stats = {}
         [self.stats.update({key: 0}) for key in StreamHandler.inputParsers]
@@ -914,10 +1225,18 @@ class StreamHandler:
         self.rates = []
         self.sent = 0
         self.rx, self.tx = 0, 0
+        self.timestamp = time.time()
 
+        # Selectable streams are served by the reactor, others by their own thread
         self.terminate = False
-        self.thread = threading.Thread(target=self.run)
-        self.thread.start()
+        if reactor is not None and hasattr(stream, 'fileno') and hasattr(stream, 'receive'):
+            self.reactor = reactor
+            self.thread = None
+            self.reactor.register(self)
+        else:
+            self.reactor = None
+            self.thread = threading.Thread(target=self.run)
+            self.thread.start()
 
     def getMessageCounters(self):
         return (self.parser.counter.received, self.sent, self.parser.counter.errors)
@@ -946,34 +1265,40 @@ class StreamHandler:
 
     def stop(self):
         self.terminate = True
-        self.thread.join()
+        if self.thread is not None:
+            self.thread.join()
+        else:
+            self.reactor.unregister(self)
 
-    def run(self):
-        timestamp = time.time()
+    def receive(self):
+        data = self.stream.receive()
+        if data is None:
+            debug('Stream closed')
+            self.reactor.unregister(self)
+        else:
+            self.process(data)
 
-        while not self.terminate:
-            data = self.stream.read()
-
-            self.rx += len(data)
-            while len(data) > 0:
-                count = self.parser.process(data)
-                data = data[count:]
-
-                if self.parser.state == Parser.State.DONE:
-                    ident, payload = self.parser.packet.id, self.parser.packet.data
-                    if ident in StreamHandler.inputParsers:
-                        self.stats[ident] += 1
-                        fields = StreamHandler.inputParsers[ident](payload)
-                        debug('RX: ' + str(fields))
-                        for callback in self.callbacks:
-                            callback(fields)
-                    else:
-                        debug('RX: unknown message, class {:02X}, length {:d}'.format(ident, len(payload)))
+    def process(self, data):
+        self.rx += len(data)
+        for packet in self.parser.feed(data):
+            ident, payload = packet.id, packet.data
+            if ident in StreamHandler.inputParsers:
+                self.stats[ident] += 1
+                fields = StreamHandler.inputParsers[ident](payload)
+                debug('RX: ' + str(fields))
+                for callback in self.callbacks.match(fields):
+                    callback(fields)
+            else:
+                debug('RX: unknown message, class {:02X}, length {:d}'.format(ident, len(payload)))
 
-            if time.time() > timestamp + 1.0:
-                self.rates = ([(self.rx, self.tx)] + self.rates)[:60]
-                self.rx, self.tx = 0, 0
-                timestamp = time.time()
+        if time.time() > self.timestamp + 1.0:
+            self.rates = ([(self.rx, self.tx)] + self.rates)[:60]
+            self.rx, self.tx = 0, 0
+            self.timestamp = time.time()
+
+    def run(self):
+        while not self.terminate:
+            self.process(self.stream.read())
 
 
 class Field:
@@ -992,6 +1317,7 @@ class Field:
         self.min = None
         self.max = None
         self.value = None
+        self.written = None
 
     @staticmethod
     def flagsToString(flags):
@@ -1040,16 +1366,16 @@ class Field:
         else:
             return False
 
-    def read(self, callback=None, blocking=True):
+    def read(self, callback=None, blocking=True, priority=Priority.NORMAL):
         proxyCallback = lambda packet: listen((Message.COMPONENT_FIELD, Message.COMPONENT_FIELD_RESPONSE), packet,
                 lambda fields: self.onFieldRead(fields, callback))
         request = {'id': Message.COMPONENT_FIELD_REQUEST, 'component': self.component.address,
                 'field': self.index, 'type': self.type}
 
         if not blocking or callback is not None:
-            self.component.messenger.invokeAsync(packet=request, callback=proxyCallback)
+            self.component.messenger.invokeAsync(packet=request, callback=proxyCallback, priority=priority)
         else:
-            response = self.component.messenger.invoke(packet=request, callback=proxyCallback)
+            response = self.component.messenger.invoke(packet=request, callback=proxyCallback, priority=priority)
             if response is None:
                 raise CommandError(Result.GENERIC_TIMEOUT)
             if response['id'] != Message.COMPONENT_FIELD:
@@ -1071,16 +1397,16 @@ class Field:
         else:
             return False
 
-    def write(self, value, callback=None, blocking=True):
+    def write(self, value, callback=None, blocking=True, priority=Priority.NORMAL):
         proxyCallback = lambda packet: listen(Message.COMPONENT_FIELD_RESPONSE, packet,
                 lambda fields: self.onFieldWritten(value, fields, callback))
         request = {'id': Message.COMPONENT_FIELD, 'component': self.component.address,
                 'field': self.index, 'type': self.type, 'value': value}
 
         if not blocking or callback is not None:
-            self.component.messenger.invokeAsync(packet=request, callback=proxyCallback)
+            self.component.messenger.invokeAsync(packet=request, callback=proxyCallback, priority=priority)
         else:
-            response = self.component.messenger.invoke(packet=request, callback=proxyCallback)
+            response = self.component.messenger.invoke(packet=request, callback=proxyCallback, priority=priority)
             if response is None:
                 raise CommandError(Result.GENERIC_TIMEOUT)
             if response['result'] != Result.SUCCESS:
@@ -1090,6 +1416,7 @@ class Field:
         if fields['component'] == self.component.address and fields['field'] == self.index:
             if fields['result'] == Result.SUCCESS:
                 self.value = value
+                self.written = value
             if callback is not None:
                 callback(self, Result(fields['result']), self.value)
             return True
@@ -1097,25 +1424,335 @@ class Field:
             return False
 
 
-class File:
-    class RequestState:
-        def __init__(self):
-            self.checksum = 0
-            self.result = Result(Result.SUCCESS)
-            self.position = 0
-            self.total = 0
-            self.retries = 0
-            self.sem = threading.Semaphore(0)
-            self.timeout = False
-            self.data = bytes()
+class FileTransfer:
+    ''' Windowed file transfer with selective retransmission.
+    The file is split into segments of the chunk size, received segments are marked in a bitmap
+    and only missing segments are requested again. The number of requests in flight follows
+    additive increase and multiplicative decrease, retransmission timeout follows measured round trip time.
+    '''
+
+    class Request:
+        def __init__(self, sequence, segments):
+            self.sequence = sequence
+            self.segments = segments
+            self.pending = set(segments)
+            self.sendTime = time.time()
+            self.timer = None
+            self.overtaken = 0
+            self.answered = False
+            self.retransmit = False
+
+
+    READ, WRITE = range(0, 2)
+
+    # Responses to later requests after which an earlier request is considered lost,
+    # the threshold grows when such requests turn out to be reordered
+    reorderThreshold = 3
+    maxWindow = 32
+    minTimeout = 0.05
+
+    def __init__(self, stream, mode, buffer, start, total, chunkSize, burstSize, checksum=None):
+        self.stream = stream
+        self.messenger = stream.component.messenger
+        self.reactor = self.messenger.reactor
+        self.mode = mode
+        self.buffer = buffer
+        self.start = start
+        self.total = total
+        self.chunkSize = chunkSize
+
+        self.count = int(math.ceil((total - start) / chunkSize)) if total > start else 0
+        self.done = bytearray(self.count)
+        self.attempts = bytearray(self.count)
+        self.owners = {}
+        self.inflight = {}
+        self.lost = []
+        self.suspected = set()
+        self.reordering = FileTransfer.reorderThreshold
+        self.recovery = 0
+        self.next = 0
+        self.base = 0
+        self.sequence = 0
+        self.completed = 0
+        self.result = Result(Result.SUCCESS)
+        self.finished = threading.Event()
+        self.mutex = threading.Lock()
+
+        # Reads request several segments at once, writes send one segment per request
+        self.burst = max(1, int(burstSize)) if mode == FileTransfer.READ else 1
+        self.maxBurst = max(self.burst, min(self.burst * 4, int(0xFFFF / chunkSize)))
+        self.window = 2.0
+        self.threshold = float(FileTransfer.maxWindow)
+
+        self.smoothedRtt = None
+        self.rttVariance = None
+        self.timeout = self.messenger.defaultTimeout
+
+        self.startTime = None
+        self.retransmitted = 0
+        self.duplicates = 0
+
+        # Running crc32 of the contiguous transferred part, None when it is not needed
+        self.checksum = checksum
+        self.checksumEnd = start
+
+    @property
+    def position(self):
+        return self.start + self.completed
+
+    def segmentRange(self, segment):
+        begin = self.start + segment * self.chunkSize
+        return begin, min(begin + self.chunkSize, self.total)
+
+    def run(self):
+        if self.count == 0:
+            return self.result
+        self.startTime = time.time()
+
+        ident = (Message.COMPONENT_FILE_READ_RESPONSE, Message.COMPONENT_FILE_READ_ERROR) \
+                if self.mode == FileTransfer.READ else Message.COMPONENT_FILE_WRITE_RESPONSE
+        self.messenger.subscribe(self.onResponse, ident, self.stream.component.address)
+        try:
+            with self.mutex:
+                self.pump()
+            self.finished.wait()
+        finally:
+            self.messenger.forget(self.onResponse, ident, self.stream.component.address)
+            with self.mutex:
+                for request in self.inflight.values():
+                    self.reactor.cancel(request.timer)
+                self.inflight, self.owners = {}, {}
+
+        verbose('File {:d}:{:d} {:s} {:d} bytes in {:.2f} s, {:.1f} KiB/s, {:d} segments resent'.format(
+                self.stream.component.address, self.stream.index, 'read' if self.mode == FileTransfer.READ else 'written',
+                self.completed, self.elapsed(), self.throughput() / 1024, self.retransmitted))
+        return self.result
+
+    def elapsed(self):
+        return time.time() - self.startTime if self.startTime is not None else 0.0
+
+    def throughput(self):
+        elapsed = self.elapsed()
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        ''' Return values:
+        Stats -- dictionary with transferred bytes, elapsed time, throughput in bytes per second,
+        resent segments, duplicate responses, smoothed round trip time and current window
+        '''
+        return {'bytes': self.completed, 'time': self.elapsed(), 'throughput': self.throughput(),
+                'retransmitted': self.retransmitted, 'duplicates': self.duplicates,
+                'rtt': self.smoothedRtt, 'window': self.window, 'burst': self.burst}
+
+    def finish(self, result):
+        if self.result.value == Result.SUCCESS:
+            self.result = result
+        self.finished.set()
+
+    def pump(self):
+        # Called with the mutex held
+        while not self.finished.is_set() and len(self.inflight) < int(self.window):
+            segments = self.nextSegments()
+            if len(segments) == 0:
+                break
+            self.send(segments)
+
+    def isMissing(self, segment):
+        return not self.done[segment] and segment not in self.owners
+
+    def nextSegments(self):
+        # Lost segments are sent again first, lowest positions first
+        while len(self.lost) > 0:
+            segment = heapq.heappop(self.lost)
+            if self.isMissing(segment):
+                segments = [segment]
+                # Merge adjacent lost segments into one read request
+                while self.mode == FileTransfer.READ and len(segments) < self.burst and len(self.lost) > 0 \
+                        and self.lost[0] <= segments[-1] + 1:
+                    segment = heapq.heappop(self.lost)
+                    if segment == segments[-1] + 1 and self.isMissing(segment):
+                        segments.append(segment)
+                return segments
+
+        if self.mode == FileTransfer.WRITE and self.next - self.base >= FileTransfer.maxWindow:
+            return []
+        segments = list(range(self.next, min(self.next + self.burst, self.count)))
+        self.next += len(segments)
+        return segments
+
+    def send(self, segments):
+        for segment in segments:
+            self.attempts[segment] += 1
+            if self.attempts[segment] > self.messenger.defaultRetryCount:
+                self.finish(Result(Result.GENERIC_TIMEOUT))
+                return
+
+        self.sequence += 1
+        request = FileTransfer.Request(self.sequence, segments)
+        request.retransmit = any(self.attempts[segment] > 1 for segment in segments)
+        if request.retransmit:
+            self.retransmitted += len(segments)
+        for segment in segments:
+            self.owners[segment] = request
+        self.inflight[request.sequence] = request
+
+        begin, end = self.segmentRange(segments[0])[0], self.segmentRange(segments[-1])[1]
+        if self.mode == FileTransfer.READ:
+            self.stream.readFileChunk(begin, self.chunkSize, len(segments), end - begin)
+        else:
+            self.stream.writeFileChunk(begin, self.buffer[begin - self.start:end - self.start])
+        request.timer = self.reactor.schedule(request.sendTime + self.timeout, lambda: self.onTimeout(request))
+
+    def release(self, request):
+        self.reactor.cancel(request.timer)
+        del self.inflight[request.sequence]
+        for segment in request.segments:
+            if self.owners.get(segment) is request:
+                del self.owners[segment]
+
+    def onSegment(self, request, segment):
+        request.pending.discard(segment)
+        self.suspected.discard(segment)
+        self.done[segment] = 1
+        self.attempts[segment] = 0
+        begin, end = self.segmentRange(segment)
+        self.completed += end - begin
+        while self.base < self.count and self.done[self.base]:
+            self.base += 1
+        if self.checksum is not None:
+            self.updateChecksum()
+
+        if not request.answered:
+            request.answered = True
+            # Earlier requests overtaken by several later ones are lost
+            for other in list(self.inflight.values()):
+                if other.sequence < request.sequence:
+                    other.overtaken += 1
+                    if other.overtaken == self.reordering:
+                        self.suspected.update(other.pending)
+                        self.onLoss(other)
+
+        if len(request.pending) == 0:
+            self.release(request)
+            if not request.retransmit:
+                self.updateTimeout(time.time() - request.sendTime)
+            self.onAcknowledged()
+
+        if self.completed >= self.total - self.start:
+            self.finish(Result(Result.SUCCESS))
+
+    def updateChecksum(self):
+        end = min(self.start + self.base * self.chunkSize, self.total)
+        if end > self.checksumEnd:
+            self.checksum = binascii.crc32(self.buffer[self.checksumEnd - self.start:end - self.start], self.checksum)
+            self.checksumEnd = end
+
+    def onAcknowledged(self):
+        if self.window < self.threshold:
+            self.window = min(self.window + 1.0, FileTransfer.maxWindow)
+        else:
+            self.window = min(self.window + 1.0 / self.window, FileTransfer.maxWindow)
+        if self.mode == FileTransfer.READ and self.burst < self.maxBurst and self.window >= self.threshold:
+            self.burst += 1
+
+    def onLoss(self, request, congestion=True):
+        if request.sequence not in self.inflight:
+            return
+        self.release(request)
+        for segment in request.pending:
+            heapq.heappush(self.lost, segment)
+
+        # Window is reduced once for the requests sent before the reduction
+        if congestion and request.sequence > self.recovery:
+            self.recovery = self.sequence
+            self.threshold = max(self.window / 2.0, 1.0)
+            self.window = self.threshold
+            self.burst = max(1, self.burst // 2)
+
+    def updateTimeout(self, rtt):
+        if self.smoothedRtt is None:
+            self.smoothedRtt, self.rttVariance = rtt, rtt / 2.0
+        else:
+            self.rttVariance = 0.75 * self.rttVariance + 0.25 * abs(self.smoothedRtt - rtt)
+            self.smoothedRtt = 0.875 * self.smoothedRtt + 0.125 * rtt
+        self.timeout = min(max(self.smoothedRtt + 4.0 * self.rttVariance, FileTransfer.minTimeout),
+                self.messenger.defaultTimeout * 8)
+
+    def onDuplicate(self, segment):
+        self.duplicates += 1
+        if segment in self.suspected:
+            # Segment was sent again too early
+            self.suspected.discard(segment)
+            self.reordering = min(self.reordering + 1, FileTransfer.maxWindow)
+
+    def onTimeout(self, request):
+        with self.mutex:
+            if request.sequence not in self.inflight or self.finished.is_set():
+                return
+            debug('File {:d}:{:d} segments {:d}..{:d} timeout'.format(self.stream.component.address,
+                    self.stream.index, request.segments[0], request.segments[-1]))
+            self.timeout = min(self.timeout * 2, self.messenger.defaultTimeout * 8)
+            self.onLoss(request)
+            self.pump()
+
+    def onResponse(self, fields):
+        if fields['component'] != self.stream.component.address or fields['file'] != self.stream.index:
+            return
+
+        with self.mutex:
+            if self.finished.is_set():
+                return
+
+            position = fields['position']
+            segment = (position - self.start) // self.chunkSize
+            valid = position >= self.start and (position - self.start) % self.chunkSize == 0 \
+                    and segment < self.count
+            request = self.owners.get(segment) if valid else None
+
+            if fields['id'] == Message.COMPONENT_FILE_READ_RESPONSE:
+                begin, end = self.segmentRange(segment) if valid else (0, 0)
+                if request is None or self.done[segment] or len(fields['data']) != end - begin:
+                    self.onDuplicate(segment)
+                else:
+                    self.buffer[begin - self.start:end - self.start] = fields['data']
+                    self.onSegment(request, segment)
+            elif fields['result'] == Result.SUCCESS:
+                if request is None or self.done[segment]:
+                    self.onDuplicate(segment)
+                else:
+                    self.onSegment(request, segment)
+            else:
+                verbose('File {:d}:{:d} at {:d} error {:s} ({:d})'.format(self.stream.component.address,
+                        self.stream.index, position, str(Result(fields['result'])), fields['result']))
+
+                if fields['result'] in (Result.FILE_ERROR, Result.FILE_TIMEOUT, Result.QUEUE_ERROR):
+                    # Autopilot is busy
+                    if request is not None:
+                        self.onLoss(request)
+                elif fields['result'] == Result.FILE_POSITION_ERROR and self.mode == FileTransfer.WRITE \
+                        and valid and segment > self.base:
+                    # Chunks are committed in order, the chunk followed a lost one
+                    if request is not None:
+                        self.attempts[segment] -= 1
+                        self.onLoss(request, False)
+                        first = self.owners.get(self.base)
+                        if first is not None and first.sequence < request.sequence:
+                            self.onLoss(first)
+                else:
+                    self.finish(Result(fields['result']))
+                    return
 
+            self.pump()
 
+
+class File:
     def __init__(self, component, index, status=0):
         self.component = component
         self.index = index
         self.status = status
         self.state = None
         self.data = None
+        self.stats = None
 
     @staticmethod
     def flagsToString(flags):
@@ -1152,45 +1789,16 @@ class File:
         else:
             return False
 
-    def readFileChunk(self, position, chunkSize, burstSize):
+    def readFileChunk(self, position, chunkSize, burstSize, length=None):
         if chunkSize == 0 or burstSize == 0:
             # Incorrect settings
             raise Exception()
 
         request = {'id': Message.COMPONENT_FILE_READ, 'component': self.component.address, 'file': self.index,
-                'position': position, 'length': int(chunkSize * burstSize), 'fragment': chunkSize}
+                'position': position, 'length': int(chunkSize * burstSize) if length is None else length,
+                'fragment': chunkSize}
         self.component.messenger.invoke(packet=request)
 
-    def onFileChunkRead(self, state, fields):
-        if fields['component'] == self.component.address and fields['file'] == self.index:
-            if fields['id'] == Message.COMPONENT_FILE_READ_RESPONSE:
-                if fields['position'] == state.position:
-                    chunk = fields['data']
-                    debug('File {:d}:{:d} chunk [{:06X}:{:06X}] appended'.format(self.component.address,
-                            self.index, state.position, state.position + len(chunk)))
-
-                    state.retries = 0
-                    state.data[state.position:state.position + len(chunk)] = chunk
-                    state.position += len(chunk)
-                else:
-                    debug('File {:d}:{:d} chunk [{:06X}:{:06X}] dropped'.format(self.component.address,
-                            self.index, fields['position'], fields['position'] + len(fields['data'])))
-            else:
-                verbose('File {:d}:{:d} at {:d} error {:s} ({:d})'.format(self.component.address, self.index,
-                        fields['position'], str(Result(fields['result'])), fields['result']))
-
-                if fields['result'] not in (Result.FILE_TIMEOUT, Result.QUEUE_ERROR):
-                    state.result = Result(fields['result'])
-            state.sem.release()
-            return True
-        else:
-            return False
-
-    @staticmethod
-    def onFileChunkTimeout(state):
-        state.timeout = True
-        state.sem.release()
-
     def getProgress(self):
         state = self.state
         if state is not None:
@@ -1199,70 +1807,64 @@ class File:
         else:
             return (1.0, 0, 0)
 
-    def read(self, chunkSize=48, burstSize=4, verify=False, callback=None):
-        request = Messenger.FileReadRequest(self, chunkSize, burstSize, verify, callback)
-        self.component.messenger.invokeAsync(request=request)
-
-    def readImpl(self, chunkSize, burstSize, verify):
-        state = File.RequestState()
+    def read(self, chunkSize=48, burstSize=4, verify=False, callback=None, destination=None):
+        ''' Reads the file into data, or into destination when it is set.
+        Destination is either a path of a local file, which is memory-mapped and filled in place,
+        or a writable buffer not shorter than the file.
+        '''
+        request = Messenger.FileReadRequest(self, chunkSize, burstSize, verify, callback, destination)
+        self.component.messenger.invokeAsync(request=request, priority=Priority.BULK)
 
+    @staticmethod
+    def mapFile(path, size, writable):
+        ''' Return values:
+        Buffer -- memory-mapped file or empty bytes for empty files
+        '''
+        try:
+            with open(path, 'w+b' if writable else 'rb') as mapped:
+                if writable:
+                    mapped.truncate(size)
+                else:
+                    size = os.fstat(mapped.fileno()).st_size
+                if size == 0:
+                    return bytes()
+                return mmap.mmap(mapped.fileno(), size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            raise CommandError(Result.FILE_ACCESS_ERROR)
+
+    def readImpl(self, chunkSize, burstSize, verify, destination=None):
         # Request file size and, optionally, file checksum
-        state.total, state.checksum = self.readFileInfo(verify)
-
-        if state.total > 0:
-            callback = lambda packet: listen((Message.COMPONENT_FILE_READ_RESPONSE, Message.COMPONENT_FILE_READ_ERROR),
-                    packet, lambda fields: self.onFileChunkRead(state, fields))
-            position = 0
-            timer = None
-
-            state.data = bytearray([0] * state.total)
-            self.state = state
-            self.component.messenger.subscribe(callback)
-
-            while state.position < state.total and state.result.value == Result.SUCCESS:
-                if state.timeout:
-                    state.timeout = False
-                    state.retries += 1
-                    debug('File {:d}:{:d} data timeout {:d}/{:d}/{:d} iteration {:d}'.format(self.component.address,
-                            self.index, state.position, position, state.total, state.retries))
-                    if state.retries < self.component.messenger.defaultRetryCount:
-                        position = state.position
-                    else:
-                        state.result = Result(Result.GENERIC_TIMEOUT)
-                        break
-
-                if position < state.total and position - state.position < int(chunkSize * burstSize / 2):
-                    nextChunkSize = min(chunkSize * burstSize, state.total - position)
-                    if nextChunkSize > chunkSize:
-                        # Read as much aligned chunks as possible
-                        nextChunkSize = nextChunkSize - nextChunkSize % chunkSize
-                        self.readFileChunk(position, chunkSize, nextChunkSize / chunkSize)
-                    else:
-                        # Read last unaligned chunk
-                        self.readFileChunk(position, nextChunkSize, 1)
-
-                    if timer is not None:
-                        timer.cancel()
-                    timer = threading.Timer(self.component.messenger.defaultTimeout, File.onFileChunkTimeout, [state])
-                    timer.start()
-                    position += nextChunkSize
+        total, checksum = self.readFileInfo(verify)
 
-                state.sem.acquire()
+        if destination is None:
+            buffer = bytearray(total)
+        elif isinstance(destination, str):
+            buffer = File.mapFile(destination, total, True)
+        else:
+            buffer = memoryview(destination).cast('B')
+            if len(buffer) < total:
+                raise CommandError(Result.INCORRECT_PARAMETER)
+            buffer = buffer[:total]
 
-            if timer is not None:
-                timer.cancel()
-            self.component.messenger.forget(callback)
-            self.state = None
+        transfer = FileTransfer(self, FileTransfer.READ, buffer, 0, total, chunkSize, burstSize, 0 if verify else None)
+        self.state = transfer
+        try:
+            result = transfer.run()
 
-        if state.result.value == Result.GENERIC_TIMEOUT:
-            raise CommandTimeout()
-        if state.result.value != Result.SUCCESS:
-            raise CommandError(state.result.value)
+            if result.value == Result.GENERIC_TIMEOUT:
+                raise CommandTimeout()
+            if result.value != Result.SUCCESS:
+                raise CommandError(result.value)
 
-        if verify and state.checksum != (binascii.crc32(state.data) & 0xFFFFFFFF):
-            raise ChecksumError()
+            if verify and checksum != (transfer.checksum & 0xFFFFFFFF):
+                raise ChecksumError()
+        finally:
+            self.state = None
+            self.stats = transfer.stats()
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
 
-        self.data = bytearray(state.data)
+        self.data = buffer if not isinstance(buffer, mmap.mmap) else None
 
     def sendSpecialWriteSeq(self, position, timeout):
         # Send restart or finalize sequences
@@ -1270,7 +1872,8 @@ class File:
                 self.onFileWriteResponseReceived)
         request = {'id': Message.COMPONENT_FILE_WRITE, 'component': self.component.address,
                 'file': self.index, 'position': position, 'data': bytes()}
-        response = self.component.messenger.invoke(packet=request, callback=proxyCallback, timeout=timeout)
+        response = self.component.messenger.invoke(packet=request, callback=proxyCallback, timeout=timeout,
+                priority=Priority.BULK)
 
         if response['result'] != Result.SUCCESS:
             raise CommandError(response['result'])
@@ -1298,120 +1901,63 @@ class File:
                 'position': position, 'data': data}
         self.component.messenger.invoke(packet=request, timeout=timeout)
 
-    def onFileChunkWritten(self, chunkSize, state, fields):
-        if fields['component'] == self.component.address and fields['file'] == self.index:
-            if fields['result'] == Result.SUCCESS:
-                if fields['position'] >= state.position:
-                    expectedChunkSize = min(chunkSize, state.total - fields['position'])
-                    debug('File {:d}:{:d} chunk [{:06X}:{:06X}] committed'.format(self.component.address,
-                            self.index, state.position, fields['position'] + expectedChunkSize))
-
-                    state.retries = 0
-                    state.position = fields['position'] + expectedChunkSize
-                else:
-                    debug('File {:d}:{:d} chunk at {:d} reordered'.format(self.component.address,
-                            self.index, fields['position']))
-            else:
-                verbose('File {:d}:{:d} at {:d} error {:s} ({:d})'.format(self.component.address, self.index,
-                        fields['position'], str(Result(fields['result'])), fields['result']))
-
-                if fields['result'] in (Result.FILE_ERROR, Result.FILE_TIMEOUT, Result.QUEUE_ERROR):
-                    state.retries += 1
-
-                    if state.retries < self.component.messenger.defaultRetryCount:
-                        # Rewind file position to a previously committed one
-                        state.timeout = True
-                    else:
-                        # No retries left, propagate error to the main thread
-                        state.result = Result(fields['result'])
-                else:
-                    state.result = Result(fields['result'])
-            state.sem.release()
-            return True
-        else:
-            return False
-
     def write(self, data, chunkSize=48, burstSize=4, append=False, verify=True, callback=None):
+        ''' Data is a bytes-like object or a path of a local file, which is memory-mapped. '''
         request = Messenger.FileWriteRequest(self, data, chunkSize, burstSize, append, verify, callback)
-        self.component.messenger.invokeAsync(request=request)
+        self.component.messenger.invokeAsync(request=request, priority=Priority.BULK)
 
     def writeImpl(self, data, chunkSize, burstSize, append, verify):
-        state = File.RequestState()
+        source = File.mapFile(data, 0, False) if isinstance(data, str) else data
+        try:
+            with memoryview(source) as view, view.cast('B') as octets:
+                self.writeBuffer(octets, chunkSize, append, verify)
+        finally:
+            if isinstance(source, mmap.mmap):
+                source.close()
 
+        if not append:
+            self.data = data if not isinstance(data, str) else None
+
+    def writeBuffer(self, data, chunkSize, append, verify):
         if append:
             # In append mode file size should be requested first
             position, checksum = self.readFileInfo(verify=verify)
-            offset = position
-            if verify:
-                expectedChecksum = binascii.crc32(data, checksum) & 0xFFFFFFFF
-            state.position = position
-            state.total = position + len(data)
         else:
             self.restartWrite()
-            position = 0
-            offset = 0
-            if verify:
-                expectedChecksum = binascii.crc32(data, 0) & 0xFFFFFFFF
-            state.total = len(data)
-
-        callback = lambda packet: listen(Message.COMPONENT_FILE_WRITE_RESPONSE, packet,
-                lambda fields: self.onFileChunkWritten(chunkSize, state, fields))
-        timer = None
+            position, checksum = 0, 0
 
         self.data = None
-        self.state = state
-        self.component.messenger.subscribe(callback)
-
-        while state.position < state.total and state.result.value == Result.SUCCESS:
-            if state.timeout:
-                state.timeout = False
-                state.retries += 1
-                debug('File {:d}:{:d} data timeout {:d}/{:d}/{:d} iteration {:d}'.format(self.component.address,
-                        self.index, state.position, position, state.total, state.retries))
-                if state.retries < self.component.messenger.defaultRetryCount:
-                    position = state.position
-                else:
-                    state.result = Result(Result.GENERIC_TIMEOUT)
-                    break
-
-            while position < state.total and position - state.position < int(chunkSize * burstSize / 2):
-                nextChunkSize = min(chunkSize, state.total - position)
-                self.writeFileChunk(position, data[position - offset:position - offset + nextChunkSize])
-
-                if timer is not None:
-                    timer.cancel()
-                timer = threading.Timer(self.component.messenger.defaultTimeout, File.onFileChunkTimeout, [state])
-                timer.start()
-                position += nextChunkSize
-
-            state.sem.acquire()
-
-        if timer is not None:
-            timer.cancel()
-        self.component.messenger.forget(callback)
-        self.state = None
+        transfer = FileTransfer(self, FileTransfer.WRITE, data, position, position + len(data), chunkSize, 1,
+                checksum if verify else None)
+        self.state = transfer
+        try:
+            result = transfer.run()
+        finally:
+            self.state = None
+            self.stats = transfer.stats()
 
-        if state.result.value == Result.GENERIC_TIMEOUT:
+        if result.value == Result.GENERIC_TIMEOUT:
             raise CommandTimeout()
-        elif state.result.value != Result.SUCCESS:
-            raise CommandError(state.result.value)
+        elif result.value != Result.SUCCESS:
+            raise CommandError(result.value)
 
         if not append:
-            self.finalizeWrite(state.total)
+            self.finalizeWrite(transfer.total)
 
         if verify:
             size, checksum = self.readFileInfo(verify=True)
-            if size != state.total or checksum != expectedChecksum:
+            if size != transfer.total or checksum != (transfer.checksum & 0xFFFFFFFF):
                 raise ChecksumError()
 
-        if not append:
-            self.data = data
-
 
 class Component:
     HEALTH_OK, HEALTH_WARNING, HEALTH_ERROR, HEALTH_CRITICAL = range(0, 4)
     MODE_OPERATIONAL, MODE_INITIALIZATION, MODE_MAINTENANCE, MODE_SOFTWARE_UPDATE, MODE_OFFLINE = 0, 1, 2, 3, 7
 
+    # Classes of created fields and files, replaced by other client implementations
+    fieldClass = Field
+    fileClass = File
+
     def __init__(self, messenger, address):
         self.messenger = messenger
         self.address = address
@@ -1423,6 +1969,8 @@ class Component:
         self.count = 0
         self.fields = {}
         self.files = {}
+        self.names = {}
+        self.generation = 0
         self.mutex = threading.Lock()
         self.flagField = None
 
@@ -1430,24 +1978,17 @@ class Component:
         self.onFieldsChanged = None
 
     def __del__(self):
-        self.messenger.forget(self.componentMessageCallback)
+        self.messenger.forget(self.componentMessageCallback, Message.COMPONENT_MESSAGE, self.address)
 
     def __getitem__(self, item):
-        try:
-            index = int(item)
-            self.mutex.acquire()
-            entry = self.fields[index] if index in self.fields else None
-            self.mutex.release()
-            return entry
-        except:
-            entry = None
-            self.mutex.acquire()
-            for i in self.fields:
-                if self.fields[i].name == item:
-                    entry = self.fields[i]
-                    break
-            self.mutex.release()
-            return entry
+        # Dictionaries are only updated under the mutex, single lookups are safe without it
+        entry = self.names.get(item)
+        if entry is None:
+            try:
+                entry = self.fields.get(int(item))
+            except (TypeError, ValueError):
+                pass
+        return entry
 
     def uid(self):
         # TODO Detect different file configurations
@@ -1482,13 +2023,19 @@ class Component:
             return None
 
     def onFieldAttached(self, field):
+        # The first field with the name is found by name, as in the order of field indices
+        entry = self.names.get(field.name)
+        if entry is None or entry.index >= field.index:
+            self.names[field.name] = field
+        self.generation += 1
+
         if field.name == 'flags' and self.flagField is None:
             self.flagField = field
 
     def loadComponentDescription(self, description):
         self.mutex.acquire()
         for entry in description['fields']:
-            field = Field(self, entry['field'])
+            field = self.fieldClass(self, entry['field'])
             field.type = entry['type']
             field.size = entry['size']
             field.flags = entry['flags']
@@ -1503,7 +2050,7 @@ class Component:
             self.fields[entry['field']] = field
             self.onFieldAttached(self.fields[entry['field']])
         for entry in description['files']:
-            stream = File(self, entry['file'], entry['status'])
+            stream = self.fileClass(self, entry['file'], entry['status'])
             verbose('\tFile {:d}: flags {:s}'.format(stream.index, File.flagsToString(stream.status)))
             self.files[entry['file']] = stream
         self.mutex.release()
@@ -1554,7 +2101,7 @@ class Component:
                     self.swVersion = (fields['type'], fields['minor'], fields['revision'])
                     self.hwVersion = (1, 0)
 
-                self.messenger.subscribe(self.componentMessageCallback)
+                self.messenger.subscribe(self.componentMessageCallback, Message.COMPONENT_MESSAGE, self.address)
 
                 if callback is not None:
                     callback(self, Result(Result.SUCCESS))
@@ -1566,45 +2113,59 @@ class Component:
             return False
 
     def readFieldInfo(self):
-        allFieldsReceived = True
-        for i in range(0, self.count):
-            try:
-                field = Field(self, i)
-                field.readInfo()
+        ''' Describes all fields with pipelined requests, at most a request window of them at once.
+        Fields after the first failed one are dropped.
+        Return values:
+        Result -- True when all fields are described
+        '''
+        fields = [self.fieldClass(self, i) for i in range(0, self.count)]
+        packets = [{'id': Message.COMPONENT_FIELD_DESCRIBE, 'component': self.address, 'field': field.index}
+                for field in fields]
+        callbacks = [lambda packet, field=field: listen(
+                (
+                        Message.COMPONENT_FIELD_INFO,
+                        Message.COMPONENT_FIELD_INFO_EXT,
+                        Message.COMPONENT_FIELD_ERROR
+                ),
+                packet, field.onFieldInfoReceived) for field in fields]
+        responses = self.messenger.invokeAll(packets, callbacks)
 
-                verbose('\tField {:3d} "{:s}": type {:s}, size {:d}, flags {:s}, scale {:d}, unit "{:s}", range [{}:{}]'.format(
-                        i, field.name, Protocol.typeToString(field.type), field.size,
-                        Field.flagsToString(field.flags), field.scale, field.unit, field.min, field.max))
+        for field, response in zip(fields, responses):
+            if response is None:
+                verbose('\tField {:3d} read info timeout'.format(field.index))
+                return False
+            if response['id'] == Message.COMPONENT_FIELD_ERROR:
+                verbose('\tField {:3d} read info failed: {:s}'.format(field.index, str(Result(response['result']))))
+                return False
 
-                self.mutex.acquire()
-                self.fields[i] = field
-                self.onFieldAttached(self.fields[i])
-                self.mutex.release()
-            except CommandError as e:
-                verbose('\tField {:3d} read info failed: {:s}'.format(i, str(e)))
-                allFieldsReceived = False
-                break
-            except CommandTimeout:
-                verbose('\tField {:3d} read info timeout'.format(i))
-                allFieldsReceived = False
-                break
-        return allFieldsReceived
+            verbose('\tField {:3d} "{:s}": type {:s}, size {:d}, flags {:s}, scale {:d}, unit "{:s}", range [{}:{}]'.format(
+                    field.index, field.name, Protocol.typeToString(field.type), field.size,
+                    Field.flagsToString(field.flags), field.scale, field.unit, field.min, field.max))
+
+            self.mutex.acquire()
+            self.fields[field.index] = field
+            self.onFieldAttached(self.fields[field.index])
+            self.mutex.release()
+        return True
 
     def readFileInfo(self, start=0, end=8):
-        indices = list(range(start, end + 1)) + [255]
-        for i in indices:
-            try:
-                stream = File(self, i)
-                stream.readFileInfo()
+        streams = [self.fileClass(self, i) for i in list(range(start, end + 1)) + [255]]
+        packets = [{'id': Message.COMPONENT_FILE_DESCRIBE, 'component': self.address, 'file': stream.index,
+                'flags': 0x01} for stream in streams]
+        callbacks = [lambda packet, stream=stream: listen(
+                (Message.COMPONENT_FILE_INFO, Message.COMPONENT_FILE_INFO_ERROR),
+                packet, stream.onFileInfoReceived) for stream in streams]
+        responses = self.messenger.invokeAll(packets, callbacks)
+
+        for stream, response in zip(streams, responses):
+            if response is None:
+                break
+            if response['id'] == Message.COMPONENT_FILE_INFO:
                 verbose('\tFile {:d}: flags {:s}'.format(stream.index, File.flagsToString(stream.status)))
 
                 self.mutex.acquire()
-                self.files[i] = stream
+                self.files[stream.index] = stream
                 self.mutex.release()
-            except CommandTimeout:
-                break
-            except CommandError:
-                pass
 
     def parseComponentMessagePayload(self, payload):
         offset = 0
@@ -1616,7 +2177,7 @@ class Component:
             number = payload[offset]
             if number in self.fields:
                 field = self.fields[number]
-                value = Protocol.unpack(field.type, payload[offset + 1:])
+                value = Protocol.unpack(field.type, payload, 1, offset + 1)
                 if value is None:
                     break
                 value = value if field.size > 1 else value[0]
@@ -1649,11 +2210,56 @@ class Component:
 
         if len(entries) > 0:
             for entry in entries[:-1]:
-                entry.read(blocking=False)
-            entries[-1].read(proxyCallback)
+                entry.read(blocking=False, priority=Priority.BULK)
+            entries[-1].read(proxyCallback, priority=Priority.BULK)
         elif callback is not None:
             callback()
 
+    def writeFields(self, values, force=(), callback=None, blocking=True, priority=Priority.NORMAL):
+        ''' Writes several fields with one burst of requests, values is a list of (name or index, value) pairs.
+        Requests are sent in order without waiting for each other and acknowledgements are collected
+        together. Fields whose value equals the last acknowledged one are skipped unless listed in force.
+        Real-time commands should use Priority.CONTROL so that they are not queued behind bulk transfers.
+        Return values:
+        Count -- number of fields sent
+        '''
+        packets, callbacks, fields = [], [], []
+        for item, value in values:
+            field = self[item]
+            if field is None:
+                raise CommandError(Result.FIELD_NOT_FOUND)
+            if field.written == value and item not in force and field.name not in force:
+                continue
+            packets.append({'id': Message.COMPONENT_FIELD, 'component': self.address,
+                    'field': field.index, 'type': field.type, 'value': value})
+            callbacks.append(lambda packet, field=field, value=value: listen(Message.COMPONENT_FIELD_RESPONSE,
+                    packet, lambda fields: field.onFieldWritten(value, fields)))
+            fields.append(field)
+
+        if len(packets) == 0:
+            if callback is not None:
+                callback(self, Result(Result.SUCCESS))
+            return 0
+
+        if not blocking or callback is not None:
+            proxyCallback = (lambda responses: callback(self, Component.batchResult(responses))) \
+                    if callback is not None else None
+            self.messenger.invokeAllAsync(packets, callbacks, proxyCallback, priority=priority)
+        else:
+            result = Component.batchResult(self.messenger.invokeAll(packets, callbacks, priority=priority))
+            if result.value != Result.SUCCESS:
+                raise CommandError(result.value)
+        return len(packets)
+
+    @staticmethod
+    def batchResult(responses):
+        for response in responses:
+            if response is None:
+                return Result(Result.GENERIC_TIMEOUT)
+            if response['result'] != Result.SUCCESS:
+                return Result(response['result'])
+        return Result(Result.SUCCESS)
+
     # FIXME
     # def findFilesAsync(self, start, end):
     #     self.files = {}
@@ -1663,12 +2269,86 @@ class Component:
     #         self.readFileInfoAsync(i)
 
 
+class DescriptionCache:
+    ''' Component descriptions stored by component uid in a directory shared by all hubs.
+    Files are replaced atomically, so several processes may fill the same directory.
+    Parsed descriptions are kept in memory and the files are read only once.
+    '''
+
+    instances = {}
+    instancesMutex = threading.Lock()
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.descriptions = {}
+        self.mutex = threading.Lock()
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def shared(directory):
+        ''' Return values:
+        DescriptionCache -- cache for the directory, one per directory in the process
+        '''
+        key = os.path.realpath(directory)
+        with DescriptionCache.instancesMutex:
+            if key not in DescriptionCache.instances:
+                DescriptionCache.instances[key] = DescriptionCache(directory)
+            return DescriptionCache.instances[key]
+
+    def path(self, uid):
+        return os.path.join(self.directory, uid + '.json')
+
+    def load(self, uid):
+        ''' Return values:
+        Description -- parsed description or None when it is not cached
+        '''
+        description = self.descriptions.get(uid)
+        if description is None:
+            try:
+                with open(self.path(uid), 'rb') as descriptionFile:
+                    description = json.loads(descriptionFile.read().decode())
+            except (OSError, ValueError):
+                return None
+            with self.mutex:
+                description = self.descriptions.setdefault(uid, description)
+        return description
+
+    def save(self, uid, description):
+        data = json.dumps(description).encode()
+        with self.mutex:
+            if uid in self.descriptions:
+                return
+            # Same value types as in descriptions loaded from files
+            self.descriptions[uid] = json.loads(data.decode())
+
+        if os.path.isfile(self.path(uid)):
+            return
+        # Readers see either no file or the whole one
+        handle, name = tempfile.mkstemp(prefix=uid + '.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as descriptionFile:
+                descriptionFile.write(data)
+            os.replace(name, self.path(uid))
+        except:
+            os.remove(name)
+            raise
+
+
 class Hub:
+    componentClass = Component
+
+    # Components discovered at once, their requests share the request window
+    discoveryWorkers = 4
+
     def __init__(self, messenger, cache=None):
         self.messenger = messenger
         self.cache = cache
         self.count = 0
         self.components = {}
+        self.names = {}
+        self.generation = 0
         self.parameters = {}
         self.mutex = threading.Lock()
         self.onFieldsChanged = None
@@ -1677,30 +2357,40 @@ class Hub:
         self.model = 255
         self.lic = None
 
-        if self.cache is not None and not os.path.isdir(self.cache):
-            os.mkdir(self.cache)
+        if self.cache is not None and not isinstance(self.cache, DescriptionCache):
+            self.cache = DescriptionCache.shared(self.cache)
 
     def __getitem__(self, item):
-        try:
-            address = int(item)
-            self.mutex.acquire()
-            entry = self.components[address] if address in self.components else None
-            self.mutex.release()
-            return entry
-        except:
-            entry = None
-            self.mutex.acquire()
-            for i in self.components:
-                if self.components[i].name == item:
-                    entry = self.components[i]
-                    break
-            self.mutex.release()
-            return entry
+        entry = self.names.get(item)
+        if entry is None:
+            try:
+                entry = self.components.get(int(item))
+            except (TypeError, ValueError):
+                pass
+        return entry
+
+    def field(self, component, field):
+        ''' Return values:
+        FieldHandle -- field reference that may be stored by the caller and survives reconnection
+        '''
+        return FieldHandle(self, component, field)
+
+    def attachComponent(self, component):
+        with self.mutex:
+            self.components[component.address] = component
+            entry = self.names.get(component.name)
+            if entry is None or entry.address >= component.address:
+                self.names[component.name] = component
+            self.generation += 1
+
+    def detachComponents(self):
+        with self.mutex:
+            self.components = {}
+            self.names = {}
+            self.generation += 1
 
     def connect(self):
-        self.mutex.acquire()
-        self.components = {}
-        self.mutex.release()
+        self.detachComponents()
 
         try:
             info = self.getProtocolInfo()
@@ -1729,48 +2419,48 @@ class Hub:
             print('failed to get component count')
             return
 
-        for i in range(0, self.count):
-            try:
-                component = Component(self.messenger, i)
-                component.readInfo()
-
-                verbose('Component {:d} "{:s}": count {:d}, type {:d}, software {:d}.{:d}.{:d}, hardware {:d}.{:d}, hash {:08X}'.format(
-                        i, component.name, component.count, component.type,
-                        component.swVersion[0], component.swVersion[1], component.swVersion[2],
-                        component.hwVersion[0], component.hwVersion[1], component.hash))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Hub.discoveryWorkers) as pool:
+            list(pool.map(self.connectComponent, range(0, self.count)))
 
-                component.onFieldsChanged = self.onComponentFieldsChanged
-                self.mutex.acquire()
-                self.components[i] = component
-                self.mutex.release()
-
-                loadedFromCache = False
+    def connectComponent(self, address):
+        try:
+            component = self.componentClass(self.messenger, address)
+            component.readInfo()
+
+            verbose('Component {:d} "{:s}": count {:d}, type {:d}, software {:d}.{:d}.{:d}, hardware {:d}.{:d}, hash {:08X}'.format(
+                    address, component.name, component.count, component.type,
+                    component.swVersion[0], component.swVersion[1], component.swVersion[2],
+                    component.hwVersion[0], component.hwVersion[1], component.hash))
+
+            component.onFieldsChanged = self.onComponentFieldsChanged
+            self.attachComponent(component)
+
+            if not self.loadDescription(component) and component.readFieldInfo():
+                component.readFileInfo()
+                self.saveDescription(component)
+        except CommandError as e:
+            verbose('Component {:d} read info failed: {:s}'.format(address, str(e)))
+            print('Component {:d} read info failed: {:s}'.format(address, str(e)))
+        except CommandTimeout:
+            verbose('Component {:d} read info timeout'.format(address))
+            print('Component {:d} read info timeout'.format(address))
+
+    def loadDescription(self, component):
+        if self.cache is None:
+            return False
+        try:
+            description = self.cache.load(component.uid())
+            if description is None:
+                return False
+            verbose('\tComponent info loaded from cache')
+            component.loadComponentDescription(description)
+            return True
+        except:
+            return False
 
-                if self.cache is not None:
-                    try:
-                        cachedDescriptionName = os.path.join(self.cache, self.components[i].uid() + '.json')
-                        with open(cachedDescriptionName, 'rb') as js_fd:
-                            descriptionData = js_fd.read() 
-                        description = json.loads(descriptionData.decode())
-                        verbose('\tComponent info loaded from cache')
-                        self.components[i].loadComponentDescription(description)
-                        loadedFromCache = True
-                    except:
-                        pass
-                if not loadedFromCache and self.components[i].readFieldInfo():
-                    self.components[i].readFileInfo()
-
-                    if self.cache is not None:
-                        cachedDescriptionName = os.path.join(self.cache, self.components[i].uid() + '.json')
-                        description = self.components[i].makeComponentDescription()
-                        with open(cachedDescriptionName, 'wb') as cache_fd:
-                            cache_fd.write(json.dumps(description).encode())
-            except CommandError as e:
-                verbose('Component {:d} read info failed: {:s}'.format(i, str(e)))
-                print('Component {:d} read info failed: {:s}'.format(i, str(e)))
-            except CommandTimeout:
-                verbose('Component {:d} read info timeout'.format(i))
-                print('Component {:d} read info timeout'.format(i))
+    def saveDescription(self, component):
+        if self.cache is not None:
+            self.cache.save(component.uid(), component.makeComponentDescription())
 
     def clearParamList(self):
         self.parameters = {}
@@ -1778,7 +2468,7 @@ class Hub:
     def getParamList(self):
         self.parameters = {}
         for i in range(0, self.getParamCount()):
-            param = self.getParam(i)
+            param = self.getParam(i, priority=Priority.BULK)
             if param is not None:
                 self.parameters[i] = (param[0], param[1])
                 verbose('Parameter {:d} "{:s}", value {:g}'.format(i, param[0], param[1]))
@@ -1791,16 +2481,16 @@ class Hub:
         '''
         return self.getParam(0xFF, callback, blocking)
 
-    def getParam(self, number, callback=None, blocking=True):
+    def getParam(self, number, callback=None, blocking=True, priority=Priority.NORMAL):
         proxyCallback = lambda packet: listen((Message.PARAM, Message.PARAM_INFO), packet,
                 lambda fields: self.onParamReceived(value=None, fields=fields, callback=callback, number=number))
         request = {'id': Message.REQ_PARAM, 'number': number}
 
         if not blocking or callback is not None:
-            self.messenger.invokeAsync(packet=request, callback=proxyCallback)
+            self.messenger.invokeAsync(packet=request, callback=proxyCallback, priority=priority)
             return None
         else:
-            response = self.messenger.invoke(packet=request, callback=proxyCallback)
+            response = self.messenger.invoke(packet=request, callback=proxyCallback, priority=priority)
             if number != 0xFF:
                 if response['id'] == Message.PARAM:
                     return (response['name'], response['value'])
@@ -1997,66 +2687,71 @@ class Hub:
             data += '{:s}={}\n'.format(*param)
         return data
 
-class Messenger:
-    class CommandState:
-        def __init__(self):
-            self.sem = threading.Semaphore(0)
-            self.response = None
+class FieldHandle:
+    ''' Reference to a field by component and field names or indices.
+    The field is resolved once and resolved again only after the hub or the component is updated.
+    '''
 
+    def __init__(self, hub, component, field):
+        self.hub = hub
+        self.component = component
+        self.field = field
+        self.generation = None
+        self.entry = None
+
+    def resolve(self):
+        ''' Return values:
+        Field -- resolved field or None when the component or the field is not found
+        '''
+        entry = self.entry
+        if entry is not None and self.generation == (self.hub.generation, entry.component.generation):
+            return entry
+
+        generation = self.hub.generation
+        component = self.hub[self.component]
+        entry = None
+        if component is not None:
+            generation = (generation, component.generation)
+            entry = component[self.field]
+        self.generation = generation
+        self.entry = entry
+        return entry
 
-    class GenericRequest:
-        def __init__(self, messenger, packet, callback, retries, timeout):
-            self.messenger = messenger
+    def get(self):
+        entry = self.resolve()
+        if entry is None:
+            raise CommandError(Result.FIELD_NOT_FOUND)
+        return entry
+
+    def read(self, *args, **kwargs):
+        return self.get().read(*args, **kwargs)
+
+    def write(self, *args, **kwargs):
+        return self.get().write(*args, **kwargs)
+
+
+class Messenger:
+    class Future:
+        def __init__(self, packet, callback, retries, timeout, done=None, priority=Priority.NORMAL):
             self.packet = packet
             self.callback = callback
             self.retries = retries
             self.timeout = timeout
+            self.done = done
+            self.priority = priority
+            self.key = Messenger.requestKey(packet)
+            self.attempts = 0
+            self.queued = False
+            self.active = False
+            self.timer = None
+            self.sendTime = 0.0
+            self.deadline = 0.0
+            self.response = None
+            self.completed = threading.Event()
 
-        def handle(self):
-            if self.callback is None:
-                self.messenger.send(self.packet)
-            else:
-                for i in range(0, self.retries):
-                    response = Messenger.GenericRequest.genericHandler(self.messenger,
-                            self.packet, self.callback, self.timeout)
-                    if response is not None:
-                        break
-
-        @staticmethod
-        def genericHandler(messenger, packet, callback, timeout):
-            def waitForCompletion(state, timeout):
-                timer = threading.Timer(timeout, lambda state: state.sem.release(), [state])
-                timer.start()
-                state.sem.acquire()
-                endTime = time.time()
-                timer.cancel()
-
-            state = Messenger.CommandState()
-            proxyCallback = lambda fields: Messenger.messageCallback(state, callback, fields)
-
-            # Send command
-            startTime = time.time()
-            messenger.send(packet, proxyCallback)
-
-            # First stage: wait for answer
-            waitForCompletion(state, timeout)
-            endTime = time.time()
-
-            # Second stage: if command was queued, wait for deferred answer
-            try:
-                if state.response['result'] == Result.COMMAND_QUEUED:
-                    timeout -= endTime - startTime
-                    waitForCompletion(state, timeout)
-                    endTime = time.time()
-            except:
-                pass
-
-            # Clean state
-            messenger.forget(proxyCallback)
-
-            if state.response is not None:
-                messenger.latency = ([endTime - startTime] + messenger.latency)[:100]
-            return state.response
+        def result(self, timeout=None):
+            self.completed.wait(timeout)
+            return self.response
 
 
     class FileRequest:
@@ -2068,16 +2763,17 @@ class Messenger:
 
 
     class FileReadRequest(FileRequest):
-        def __init__(self, stream, chunkSize, burstSize, verify, callback):
+        def __init__(self, stream, chunkSize, burstSize, verify, callback, destination=None):
             Messenger.FileRequest.__init__(self, stream, chunkSize, burstSize, callback)
             self.verify = verify
+            self.destination = destination
 
         def getProgress(self):
             return self.stream.getProgress()
 
         def handle(self):
             try:
-                self.stream.readImpl(self.chunkSize, self.burstSize, self.verify)
+                self.stream.readImpl(self.chunkSize, self.burstSize, self.verify, self.destination)
                 result = Result(Result.SUCCESS)
             except CommandError as e:
                 result = Result(e.value)
@@ -2107,12 +2803,61 @@ class Messenger:
                 self.callback(self.stream, result)
 
 
-    def __init__(self, stream, cache=None):
+    # Requests and their responses share a correlation kind, the key also holds component and field or file
+    requestKinds = {
+            Message.REQ_PARAM:                'param',
+            Message.PARAM:                    'param',
+            Message.PROTOCOL_REQUEST:         'protocol',
+            Message.LICENSE_INFO_REQUEST:     'license',
+            Message.SYSTEM_COMMAND:           'command',
+            Message.COMPONENT_COUNT_REQUEST:  'count',
+            Message.COMPONENT_INFO_REQUEST:   'component',
+            Message.COMPONENT_FIELD_REQUEST:  'field',
+            Message.COMPONENT_FIELD:          'field',
+            Message.COMPONENT_FIELD_DESCRIBE: 'describe',
+            Message.COMPONENT_FILE_DESCRIBE:  'file',
+            Message.COMPONENT_FILE_WRITE:     'write',
+            Message.COMPONENT_FILE_READ:      'read',
+            Message.GO_TO_POINT_V2:           'point'
+    }
+
+    responseKinds = {
+            Message.PARAM_INFO:                    'param',
+            Message.PARAM:                         'param',
+            Message.PROTOCOL_INFO:                 'protocol',
+            Message.LICENSE_INFO:                  'license',
+            Message.SYSTEM_COMMAND_RESPONSE:       'command',
+            Message.COMPONENT_COUNT:               'count',
+            Message.COMPONENT_INFO:                'component',
+            Message.COMPONENT_INFO_EXT:            'component',
+            Message.COMPONENT_INFO_ERROR:          'component',
+            Message.COMPONENT_FIELD:               'field',
+            Message.COMPONENT_FIELD_RESPONSE:      'field',
+            Message.COMPONENT_FIELD_INFO:          'describe',
+            Message.COMPONENT_FIELD_INFO_EXT:      'describe',
+            Message.COMPONENT_FIELD_ERROR:         'describe',
+            Message.COMPONENT_FILE_INFO:           'file',
+            Message.COMPONENT_FILE_INFO_ERROR:     'file',
+            Message.COMPONENT_FILE_WRITE_RESPONSE: 'write',
+            Message.COMPONENT_FILE_READ_RESPONSE:  'read',
+            Message.COMPONENT_FILE_READ_ERROR:     'read',
+            Message.GO_TO_POINT_RESPONSE:          'point'
+    }
+
+    def __init__(self, stream, cache=None, window=16, reactor=None):
         self.terminate = False
-        self.requests = []
+        self.requests = [collections.deque() for i in range(0, Priority.COUNT)]
         self.requestSem = threading.Condition(threading.Lock())
+        self.working = False
         self.latency = []
 
+        # Pipelined requests: at most window requests wait for responses, the rest wait in backlog
+        self.window = window
+        self.pending = {}
+        self.inflight = 0
+        self.backlog = [collections.deque() for i in range(0, Priority.COUNT)]
+        self.pendingMutex = threading.Condition(threading.Lock())
+
         # Common protocol settings
         self.defaultRetryCount = 4
         self.defaultTimeout = 0.25
@@ -2122,10 +2867,11 @@ class Messenger:
         self.requestCount = 0
         self.currentRequest = None
 
-        self.handler = StreamHandler(stream)
+        # Stream I/O, request timers and queued requests are served by threads shared between messengers
+        self.reactor = reactor if reactor is not None else Reactor.shared()
+        self.handler = StreamHandler(stream, self.reactor)
+        self.handler.callbacks.add(self.dispatch, tuple(Messenger.responseKinds))
         self.hub = Hub(self, cache)
-        self.thread = threading.Thread(target=self.run)
-        self.thread.start()
 
     def __getitem__(self, item):
         return self.hub[item]
@@ -2133,87 +2879,261 @@ class Messenger:
     def connect(self):
         self.hub.connect()
 
-    def forget(self, callback):
-        if callback in self.handler.callbacks:
-            self.handler.callbacks.remove(callback)
+    def forget(self, callback, ident=None, component=None):
+        self.handler.callbacks.remove(callback, ident, component)
 
     def send(self, message, callback=None):
         if callback is not None:
             self.subscribe(callback)
         self.handler.send(message)
 
-    def subscribe(self, callback):
-        if callback not in self.handler.callbacks:
-            self.handler.callbacks.append(callback)
+    def subscribe(self, callback, ident=None, component=None):
+        ''' Callback receives messages with id ident, or one of ids if it is a tuple,
+        sent by component, all messages by default.
+        '''
+        self.handler.callbacks.add(callback, ident, component)
 
     def stop(self):
         self.handler.stop()
 
-        self.terminate = True
-        self.thread.join()
+        with self.requestSem:
+            self.terminate = True
+            while self.working:
+                self.requestSem.wait()
+
+        # Release everybody who still waits for a response
+        with self.pendingMutex:
+            futures = [future for queue in list(self.pending.values()) + self.backlog for future in queue]
+            self.pending, self.inflight = {}, 0
+            self.backlog = [collections.deque() for i in range(0, Priority.COUNT)]
+        for future in futures:
+            self.reactor.cancel(future.timer)
+            self.finish(future)
+
+    @staticmethod
+    def requestKey(packet):
+        kind = Messenger.requestKinds.get(packet['id'])
+        if kind is None:
+            return None
+        return (kind, packet.get('component'), packet.get('field', packet.get('file')))
+
+    @staticmethod
+    def responseKey(fields):
+        kind = Messenger.responseKinds.get(fields['id'])
+        if kind is None:
+            return None
+        return (kind, fields.get('component'), fields.get('field', fields.get('file')))
+
+    def submit(self, packet, callback, retries=None, timeout=None, done=None, priority=Priority.NORMAL):
+        ''' Sends a request without waiting for the response, callback accepts the response packet.
+        Requests over the window are sent as soon as earlier ones complete, in order of priority
+        and then in order of submission. Control requests are sent immediately.
+        Return values:
+        Future -- completed with the response or with None after all retries
+        '''
+        if retries is None:
+            retries = self.defaultRetryCount
+        if timeout is None:
+            timeout = self.defaultTimeout
+
+        future = Messenger.Future(packet, callback, retries, timeout, done, priority)
+        with self.pendingMutex:
+            self.requestCount += 1
+            if self.inflight >= self.window and priority != Priority.CONTROL:
+                self.backlog[priority].append(future)
+                return future
+            self.attach(future)
+        self.handler.send(future.packet)
+        return future
+
+    def attach(self, future):
+        # Must be called with pendingMutex held
+        self.inflight += 1
+        if future.key not in self.pending:
+            self.pending[future.key] = collections.deque()
+        self.pending[future.key].append(future)
+        future.active = True
+        future.attempts = 1
+        future.sendTime = time.time()
+        future.deadline = future.sendTime + future.timeout
+        future.timer = self.reactor.schedule(future.deadline, lambda: self.onTimeout(future))
+
+    def detach(self, future):
+        # Must be called with pendingMutex held, returns requests moved from backlog to the window
+        queue = self.pending[future.key]
+        queue.remove(future)
+        if len(queue) == 0:
+            del self.pending[future.key]
+        self.inflight -= 1
+        future.active = False
+        self.reactor.cancel(future.timer)
+
+        promoted = []
+        for queue in self.backlog:
+            while len(queue) > 0 and self.inflight < self.window:
+                promoted.append(queue.popleft())
+                self.attach(promoted[-1])
+        return promoted
+
+    def backlogCount(self):
+        return sum(len(queue) for queue in self.backlog)
+
+    def finish(self, future):
+        future.completed.set()
+        if future.done is not None:
+            future.done(future.response)
+
+    def dispatch(self, fields):
+        key = Messenger.responseKey(fields)
+        if key is None:
+            return False
+
+        # Responses of one key complete requests in order of sending
+        with self.pendingMutex:
+            candidates = list(self.pending.get(key, ())) + list(self.pending.get(None, ()))
+        for future in candidates:
+            if future.callback(fields):
+                self.onResponse(future, fields)
+                return True
+        return False
 
-    def invoke(self, packet, callback=None, retries=None, timeout=None):
+    def onResponse(self, future, fields):
+        with self.pendingMutex:
+            if not future.active:
+                # Request has already expired
+                return
+            future.response = fields
+
+            if fields.get('result') == Result.COMMAND_QUEUED and not future.queued:
+                # Command was queued, wait for deferred answer until the same deadline
+                future.queued = True
+                return
+
+            self.latency = ([time.time() - future.sendTime] + self.latency)[:100]
+            promoted = self.detach(future)
+
+        self.finish(future)
+        for entry in promoted:
+            self.handler.send(entry.packet)
+
+    def onTimeout(self, future):
+        # Called by the reactor when the deadline of the request has passed
+        promoted = []
+        with self.pendingMutex:
+            if not future.active:
+                return
+            resend = future.attempts < future.retries and not future.queued
+            if resend:
+                future.attempts += 1
+                future.sendTime = time.time()
+                future.deadline = future.sendTime + future.timeout
+                future.timer = self.reactor.schedule(future.deadline, lambda: self.onTimeout(future))
+            else:
+                promoted = self.detach(future)
+
+        if resend:
+            debug('Request {:d} attempt {:d}'.format(future.packet['id'], future.attempts))
+            self.handler.send(future.packet)
+        else:
+            self.finish(future)
+            for entry in promoted:
+                self.handler.send(entry.packet)
+
+    def invoke(self, packet, callback=None, retries=None, timeout=None, priority=Priority.NORMAL):
         if callback is None:
             self.send(packet)
             return None
         else:
-            if retries is None:
-                retries = self.defaultRetryCount
-            if timeout is None:
-                timeout = self.defaultTimeout
-
-            for i in range(0, retries):
-                response = Messenger.GenericRequest.genericHandler(self, packet, callback, timeout)
-                debug(str(response))
-                if response is not None:
-                    return response
-
-    def invokeAsync(self, packet=None, request=None, callback=None, retries=None, timeout=None):
-        self.requestSem.acquire()
+            self.checkBlocking()
+            response = self.submit(packet, callback, retries, timeout, priority=priority).result()
+            debug(str(response))
+            return response
+
+    def checkBlocking(self):
+        if self.reactor.isCurrentThread():
+            # Response would have to be received by the waiting thread itself
+            raise Exception('Blocking request from a message callback')
+
+    def invokeAll(self, packets, callbacks, retries=None, timeout=None, priority=Priority.NORMAL):
+        ''' Sends all packets without waiting for each other and waits for the responses together,
+        callbacks[i] accepts the response to packets[i]. Only unanswered packets are sent again.
+        Return values:
+        Responses -- list of responses in order of packets, None for unanswered ones
+        '''
+        self.checkBlocking()
+        futures = [self.submit(packet, callback, retries, timeout, priority=priority)
+                for packet, callback in zip(packets, callbacks)]
+        return [future.result() for future in futures]
+
+    def invokeAllAsync(self, packets, callbacks, done=None, retries=None, timeout=None, priority=Priority.NORMAL):
+        responses = [None] * len(packets)
+        remaining = [len(packets)]
+        mutex = threading.Lock()
+
+        def onDone(index, response):
+            with mutex:
+                responses[index] = response
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and done is not None:
+                done(responses)
+
+        for i in range(0, len(packets)):
+            self.submit(packets[i], callbacks[i], retries, timeout,
+                    lambda response, index=i: onDone(index, response), priority)
+
+    def invokeAsync(self, packet=None, request=None, callback=None, retries=None, timeout=None,
+            priority=Priority.NORMAL):
         if packet is not None:
-            if retries is None:
-                retries = self.defaultRetryCount
-            if timeout is None:
-                timeout = self.defaultTimeout
-
-            self.requests.append(Messenger.GenericRequest(self, packet, callback, retries, timeout))
+            if callback is None:
+                self.send(packet)
+            else:
+                self.submit(packet, callback, retries, timeout, priority=priority)
         elif request is not None:
-            self.requests.append(request)
+            with self.requestSem:
+                self.requests[priority].append(request)
+                self.requestCount += 1
+                if not self.working:
+                    self.working = True
+                    self.reactor.execute(self.run)
         else:
             raise Exception()
-        self.requestCount += 1
-        self.requestSem.notify()
-        self.requestSem.release()
+
+    def queuedCount(self):
+        with self.requestSem:
+            requests = sum(len(queue) for queue in self.requests)
+        with self.pendingMutex:
+            return requests + self.inflight + self.backlogCount()
 
     def resetProgress(self):
-        self.requestCount = len(self.requests)
+        self.requestCount = self.queuedCount()
 
     def getProgress(self):
         request = self.currentRequest
-        if isinstance(request, Messenger.GenericRequest):
-            total = self.requestCount
-            count = min(len(self.requests), total)
-            completed = total - count
-            progress = float(completed) / total if total > 0 else 1.0
-            return (progress, completed, total)
-        elif isinstance(request, Messenger.FileReadRequest) or isinstance(request, Messenger.FileWriteRequest):
+        if isinstance(request, Messenger.FileReadRequest) or isinstance(request, Messenger.FileWriteRequest):
             return request.getProgress()
+
+        total = self.requestCount
+        count = min(self.queuedCount(), total)
+        if count > 0:
+            completed = total - count
+            return (float(completed) / total, completed, total)
         else:
             return (1.0, 0, 0)
 
     def run(self):
-        while not self.terminate:
+        # Executed by the reactor pool while queued requests remain, requests of one messenger run in order
+        while True:
             with self.requestSem:
-                self.requestSem.wait(0.1)
+                queue = next((queue for queue in self.requests if len(queue) > 0), None)
+                if queue is None or self.terminate:
+                    self.working = False
+                    self.requestSem.notify_all()
+                    return
+                self.currentRequest = queue.popleft()
 
-            while len(self.requests) > 0:
-                self.currentRequest = self.requests[0]
-                self.requests = self.requests[1:]
+            try:
                 self.currentRequest.handle()
-                self.currentRequest = None
-
-    @staticmethod
-    def messageCallback(state, callback, fields):
-        if callback(fields):
-            state.response = fields
-            state.sem.release()
+            except Exception as e:
+                debug('Request failed: {:s}'.format(str(e)))
+            self.currentRequest = None
@@ -1,29 +1,31 @@
-from src.СonvertService import ConvertService
+from src.СonvertService import EnuFrame
 from src.Vector import Vector
 import time
 
 
 class ConnectService:
+    # seconds to wait after connect, preflight and takeoff of the simulated autopilots
+    delays = (10, 9, 18)
 
     @staticmethod
-    def connectDrones(drones: []) -> Vector:
+    def connectDrones(drones: [], delays=None) -> Vector:
+        connectDelay, preflightDelay, takeoffDelay = delays if delays is not None else ConnectService.delays
         for drone in drones:
             drone.connect()
-        time.sleep(10)
+        time.sleep(connectDelay)
         print("connected")
 
         for drone in drones:
             drone.uav.control.preflight()
-        time.sleep(9)
+        time.sleep(preflightDelay)
         print("preflighted")
         for drone in drones:
             drone.uav.control.takeoff()
-        time.sleep(18)
+        time.sleep(takeoffDelay)
 
         print("took off")
-        lat0, lon0, alt0 = drones[0].getLLA()
+        frame = EnuFrame(*drones[0].getLLA())
 
         for drone in drones:
-            lat, lon, alt = drone.getLLA()
-            drone.startPosition.setXYZ(*ConvertService.geodetic2enu(lat, lon, alt, lat0, lon0, alt0))
+            drone.startPosition.setXYZ(*frame.toEnu(*drone.getLLA()).tolist())
         return drones[0].getLLA()
\ No newline at end of file
@@ -5,8 +5,8 @@ from src.DroneConnector import DroneConnector
 
 
 class Drone:
-    def __init__(self, vel_m_c: int, target: Vector, drone_id: int, safe_radius: float, connected: bool):
-        self.uav = DroneConnector()
+    def __init__(self, vel_m_c: int, target: Vector, drone_id: int, safe_radius: float, connected: bool, uav=None):
+        self.uav = uav if uav is not None else DroneConnector()
         self.startPosition = Vector()
         self._velocity = Vector()
         self.target = target
@@ -34,11 +34,7 @@ class Drone:
         self.uav.control.go_manual_22mode(newVelocity.y, newVelocity.x, -newVelocity.z, 0, 1000)
 
     def getLLA(self) -> Tuple[Union[float, Any], Union[float, Any], Union[float, Any]]:
-        lat, lon, alt = int(self.uav.messenger.hub['Ublox']['latitude'].read()[0]), \
-                        int(self.uav.messenger.hub['Ublox']['longitude'].read()[0]), \
-                        int(self.uav.messenger.hub['Ublox']['altitude'].read()[0])
-        lat, lon, alt = lat / (10 ** 7), lon / (10 ** 7), alt / (10 ** 3)
-        return lat, lon, alt
+        return self.uav.getLLA()
 
     def connect(self):
         self.uav.connect()
@@ -1,5 +1,6 @@
 import argparse
 import configparser
+from typing import Tuple, Union, Any
 
 from connector.geoscan_uav import UAV
 
@@ -7,6 +8,7 @@ from connector.geoscan_uav import UAV
 class DroneConnector(UAV):
     startPort = 57890
     occupiedPorts = []
+    maxTelemetryAge = 0.5  # seconds, older pushed positions are read from the autopilot
 
     def __init__(self):
         args = argparse.ArgumentParser()
@@ -17,11 +19,23 @@ class DroneConnector(UAV):
         args.add_argument('--address', dest='address', help='server address and port X.X.X.X:X',
                           default=f'127.0.0.1:{self._getPortOfFreeContainer()}')
         args.add_argument('--modem', dest='modem', help='modem socket', default='1:2')
-        args.add_argument('--cache', dest='cache', help='component cache directory', default=f'{path}{len(DroneConnector.occupiedPorts) - 1}')
+        # component descriptions are shared by all drones, the first drone of an autopilot build fills the cache
+        args.add_argument('--cache', dest='cache', help='component cache directory',
+                          default=config.get('description_cache', f'{path}0'))
         options = args.parse_args()
         print(f'address is set to {options.address}')
 
         super().__init__(tcp=options.address, modem=options.modem, cache=options.cache)
+        self.coordinates = self.sensors.gnss.coordinates
+
+    def getLLA(self) -> Tuple[Union[float, Any], Union[float, Any], Union[float, Any]]:
+        position = self.telemetry.position(DroneConnector.maxTelemetryAge)
+        if position is not None:
+            return position
+
+        lat, lon, alt = (int(field.read()[0]) for field in self.coordinates)
+        lat, lon, alt = lat / (10 ** 7), lon / (10 ** 7), alt / (10 ** 3)
+        return lat, lon, alt
 
     @staticmethod
     def _getPortOfFreeContainer():
@@ -1,88 +1,62 @@
+from typing import List
+
+import numpy as np
+
 from src.Drone import Drone
+from src.SwarmPhysics import SwarmPhysics, quadraticDependence
 from src.Vector import Vector
-from typing import Final
 
 
-def quadraticDependence(k: float) -> float:
-    return k * k - 2 * k + 1
+class DronePhysics(SwarmPhysics):
+    # Drone-object front end of SwarmPhysics, every call packs the drones into arrays
 
-
-class DronePhysics:
-    def __init__(self):
-        self.k1: Final[float] = 2.0  # Target
-        self.k2: Final[float] = 1.0  # Swarm movement
-        self.k3: Final[float] = 2.5  # repulsion
-        self.h: Final[float] = 0.01  # step for predicting approach
-        self.approach: Final[float] = 0.2  # minimal approach of drones in one step
-        self.targetAccuracy: Final[float] = 1
+    @staticmethod
+    def packDrones(drones: List[Drone]):
+        positions = np.array([drone.position.get_xyz() for drone in drones], dtype=float).reshape(-1, 3)
+        velocities = np.array([drone.velocity.get_xyz() for drone in drones], dtype=float).reshape(-1, 3)
+        targets = np.array([drone.target.get_xyz() for drone in drones], dtype=float).reshape(-1, 3)
+        statuses = np.array([int(drone.connected) for drone in drones], dtype=int)
+        safeRadius = np.array([drone.safeRadius for drone in drones], dtype=float)
+        criticalRadius = np.array([drone.criticalRadius for drone in drones], dtype=float)
+        return positions, velocities, targets, statuses, safeRadius, criticalRadius
 
     def findLocalKopt(self, drone1: Drone, drone2: Drone):
-        # checking for critical distance of drones
-        if drone1.position.distance_to(drone2.position) <= drone1.criticalRadius:
-            return self.k3
-
-        distBefore = drone1.position.distance_to(drone2.position)
-        drone1After = drone1.position + (self.h * drone1.velocity)
-        drone2After = drone2.position + (self.h * drone2.velocity)
-        distAfter = drone1After.distance_to(drone2After)
-
-        if distBefore - distAfter <= 0:
-            return 0
-
-        # speed is taken into account only for moving drones
-        if drone1.velocity != Vector(0, 0, 0) and drone2.velocity != Vector(0, 0, 0):
-            speed = (distBefore - distAfter) / (self.h * (drone1.velocity.length() + drone2.velocity.length()))
-        else:
-            speed = 0
-
-        normalizedDist = (distBefore / drone1.safeRadius)
-        quadraticDist = quadraticDependence(normalizedDist)
-
-        # if the approach of drones is less than 'approach', then the speed will not be taken into account
-        if speed < self.approach:
-            k = quadraticDist
-        else:
-            k = (quadraticDist + speed) / 2
-
-        return k
+        positions, velocities, _, _, safeRadius, criticalRadius = self.packDrones([drone1, drone2])
+        terms = self.pairTerms(np.array([0]), np.array([1]), positions, velocities)
+        return float(self.localKopt(terms, velocities, safeRadius, criticalRadius)[0])
 
     def countKeff(self, drone: Drone):
-        values = []
-        for neighbor in drone.neighbors:
-            if drone.position.distance_to(neighbor.position) <= drone.safeRadius:
-                values.append(self.findLocalKopt(drone, neighbor))
-        return max(values) if len(values) else 0
+        drones = [drone] + drone.neighbors
+        positions, velocities, _, _, safeRadius, criticalRadius = self.packDrones(drones)
+        terms = self.pairTerms(*self.closePairs(positions, safeRadius, np.array([0]), self.neighborsOf(drone)),
+                               positions, velocities)
+        return float(self.effectiveKopt(terms, velocities, safeRadius, criticalRadius)[0])
+
+    @staticmethod
+    def neighborsOf(drone: Drone) -> np.ndarray:
+        # neighbor matrix of the [drone] + drone.neighbors group
+        neighbors = np.zeros((len(drone.neighbors) + 1, len(drone.neighbors) + 1), dtype=bool)
+        neighbors[0, 1:] = True
+        return neighbors
+
+    @staticmethod
+    def applyStatuses(drones: List[Drone], statuses: np.ndarray):
+        for drone, status in zip(drones, statuses):
+            if status == 2 and drone.connected != 2:
+                print(f'drone {drone.id} reached')
+                drone.connected = 2  # status 2 means drone has reached his target
 
     def constructVelocityVector(self, drone: Drone) -> Vector:
-        # checking for unconnected drones
-        if drone.connected == 0 or drone.connected == 2:
-            return Vector()
-
-        if drone.position.distance_to(drone.target) <= self.targetAccuracy and drone.connected:
-            print(f'drone {drone.id} reached')
-            drone.connected = 2  # status 2 means drone has reached his target
-            return Vector()
-
-        V_goal: Vector = self.k1 * (drone.target - drone.position) / (drone.target - drone.position).length()
-
-        V_close: Vector = Vector()
-        r_sum: Vector = Vector()
-        for neighbour in drone.neighbors:
-            if drone.position.distance_to(neighbour.position) <= drone.safeRadius:
-                arg1: float = (neighbour.position - drone.position).length() / min(neighbour.position.length(),
-                                                                                   drone.position.length())
-                arg_goal = (neighbour.position - drone.position) / (neighbour.position - drone.position).length()
-                r_dist = -self.k3 * self.countKeff(drone) * ((2 - arg1) * (2 - arg1)) * arg_goal
-                V_close += r_dist
-                r_sum += neighbour.position
-
-        V_swarm: Vector = Vector(0, 0, 0)
-        if len(drone.neighbors) != 0:
-            r_c = r_sum / (len(drone.neighbors))
-            V_swarm: Vector = self.k2 * (r_c - drone.position) / (r_c - drone.position).length()
-
-        # if there are no neighbors in the safety radius
-        if r_sum == 0:
-            V_close = Vector()
-
-        return V_goal + V_close + V_swarm
+        drones = [drone] + drone.neighbors
+        positions, velocities, targets, statuses, safeRadius, criticalRadius = self.packDrones(drones)
+        statuses[1:] = 0
+        commands, statuses = self.constructVelocities(positions, velocities, targets, statuses,
+                                                      safeRadius, criticalRadius, self.neighborsOf(drone))
+        self.applyStatuses([drone], statuses)
+        return Vector(*commands[0].tolist())
+
+    def constructVelocityVectors(self, drones: List[Drone]) -> List[Vector]:
+        # every drone of the swarm is a neighbor of every other one, Drone.neighbors lists are not used
+        commands, statuses = self.constructVelocities(*self.packDrones(drones))
+        self.applyStatuses(drones, statuses)
+        return [Vector(*command) for command in commands.tolist()]
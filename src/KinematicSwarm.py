@@ -0,0 +1,166 @@
+import math
+import time
+from typing import Tuple
+
+import numpy as np
+
+from src.СonvertService import EnuFrame
+
+
+class KinematicSwarm:
+    """In-process stand-in for the simulated autopilots.
+
+    Every drone is a point that follows the last ManualControl velocity command. Positions of the
+    whole swarm are kept in NumPy arrays as north/east/up metres from the first added drone and are
+    integrated with one vectorized step, so thousands of drones fit in a single process.
+    """
+
+    DISARMED, ARMED, TAKEOFF, FLYING = range(0, 4)
+
+    def __init__(self, realtime: bool = True, speedScale: float = 1 / 50, maxSpeed: float = 5.0,
+                 takeoffAltitude: float = 1.5, takeoffSpeed: float = 1.0):
+        self.realtime = realtime
+        self.minStep = 0.001
+        self.speedScale = speedScale  # m/s in one unit of go_manual_22mode speeds
+        self.maxSpeed = maxSpeed
+        self.takeoffAltitude = takeoffAltitude
+        self.takeoffSpeed = takeoffSpeed
+
+        self.origin = None
+        self.frame = None
+        self.position = np.zeros((0, 3))  # north, east, up
+        self.velocity = np.zeros((0, 3))
+        self.ground = np.zeros(0)
+        self.deadline = np.zeros(0)
+        self.mode = np.zeros(0, dtype=int)
+
+        self.time = 0.0
+        self.timestamp = time.monotonic()
+
+    def __len__(self):
+        return len(self.position)
+
+    def addDrone(self, lat: float, lon: float, alt: float = 0.0) -> int:
+        return self.addDrones([lat], [lon], [alt])[0]
+
+    def setOrigin(self, lat: float, lon: float, alt: float = 0.0):
+        self.origin = (lat, lon, alt)
+        self.frame = EnuFrame(lat, lon, alt, flat=True)
+
+    def addDrones(self, lats, lons, alts=None) -> range:
+        if alts is None:
+            alts = np.zeros(len(lats))
+        if self.origin is None:
+            self.setOrigin(float(lats[0]), float(lons[0]), float(alts[0]))
+        first = len(self.position)
+        local = np.column_stack(self.toLocal(lats, lons, alts)).reshape(-1, 3)
+
+        self.position = np.vstack((self.position, local))
+        self.velocity = np.vstack((self.velocity, np.zeros_like(local)))
+        self.ground = np.append(self.ground, local[:, 2])
+        self.deadline = np.append(self.deadline, np.zeros(len(local)))
+        self.mode = np.append(self.mode, np.full(len(local), KinematicSwarm.DISARMED))
+        return range(first, len(self.position))
+
+    def toLocal(self, lat, lon, alt):
+        east, north, up = np.moveaxis(self.frame.toEnu(lat, lon, alt), -1, 0)
+        return north, east, up
+
+    def toGeodetic(self, north, east, up):
+        return self.frame.toGeodetic(east, north, up)
+
+    def sync(self):
+        # realtime mode integrates up to the wall clock before every query,
+        # queries closer than minStep share one step
+        if self.realtime:
+            now = time.monotonic()
+            if now - self.timestamp >= self.minStep:
+                self.step(now - self.timestamp)
+                self.timestamp = now
+
+    def step(self, dt: float):
+        if dt <= 0:
+            return
+        self.time += dt
+
+        expired = (self.mode == KinematicSwarm.FLYING) & (self.deadline <= self.time)
+        self.velocity[expired] = 0
+
+        climbing = self.mode == KinematicSwarm.TAKEOFF
+        self.velocity[climbing] = (0, 0, self.takeoffSpeed)
+
+        self.position += self.velocity * dt
+
+        finished = climbing & (self.position[:, 2] >= self.ground + self.takeoffAltitude)
+        self.velocity[finished] = 0
+        self.mode[finished] = KinematicSwarm.FLYING
+
+        landed = self.position[:, 2] < self.ground
+        self.position[landed, 2] = self.ground[landed]
+
+    def arm(self, index: int):
+        self.sync()
+        if self.mode[index] == KinematicSwarm.DISARMED:
+            self.mode[index] = KinematicSwarm.ARMED
+
+    def takeoff(self, index: int):
+        self.sync()
+        if self.mode[index] == KinematicSwarm.ARMED:
+            self.mode[index] = KinematicSwarm.TAKEOFF
+
+    def command(self, index: int, north: float, east: float, down: float, interval: float):
+        # speeds are go_manual_22mode units, interval is in milliseconds
+        self.sync()
+        if self.mode[index] not in (KinematicSwarm.TAKEOFF, KinematicSwarm.FLYING):
+            return False
+
+        velocity = np.array([north, east, -down], dtype=float) * self.speedScale
+        speed = math.sqrt(velocity.dot(velocity))
+        if speed > self.maxSpeed:
+            velocity *= self.maxSpeed / speed
+        self.velocity[index] = velocity
+        self.deadline[index] = self.time + interval / 1000.0
+        self.mode[index] = KinematicSwarm.FLYING
+        return True
+
+    def getLLA(self, index: int) -> Tuple[float, float, float]:
+        self.sync()
+        lat, lon, alt = self.toGeodetic(*self.position[index])
+        return float(lat), float(lon), float(alt)
+
+    def getLLAs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.sync()
+        return self.toGeodetic(self.position[:, 0], self.position[:, 1], self.position[:, 2])
+
+
+class KinematicControl:
+    def __init__(self, swarm: KinematicSwarm, index: int):
+        self.swarm = swarm
+        self.index = index
+
+    def preflight(self):
+        self.swarm.arm(self.index)
+        return True
+
+    def takeoff(self):
+        self.swarm.takeoff(self.index)
+        return True
+
+    def go_manual_22mode(self, northSpeed, eastSpeed, downSpeed, yawSpeed, interval):
+        return self.swarm.command(self.index, northSpeed, eastSpeed, downSpeed, interval)
+
+
+class KinematicUAV:
+    # replaces DroneConnector in Drone, no autopilot container is needed
+
+    def __init__(self, swarm: KinematicSwarm, lat: float = None, lon: float = None, alt: float = 0.0,
+                 index: int = None):
+        self.swarm = swarm
+        self.index = swarm.addDrone(lat, lon, alt) if index is None else index
+        self.control = KinematicControl(swarm, self.index)
+
+    def connect(self):
+        pass
+
+    def getLLA(self) -> Tuple[float, float, float]:
+        return self.swarm.getLLA(self.index)
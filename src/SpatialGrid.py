@@ -0,0 +1,81 @@
+import itertools
+from typing import Tuple
+
+import numpy as np
+
+
+def norm(vectors: np.ndarray) -> np.ndarray:
+    # same summation order as Vector.length() and Vector.distance_to()
+    return np.sqrt(vectors[..., 0] * vectors[..., 0]
+                   + vectors[..., 1] * vectors[..., 1]
+                   + vectors[..., 2] * vectors[..., 2])
+
+
+class SpatialGrid:
+    """Uniform hash grid over the swarm positions, rebuilt every tick.
+
+    Positions are bucketed into cubic cells, a radius query only visits the cells around a drone,
+    so finding all neighbors costs O(n * k) for k drones per neighborhood instead of O(n^2).
+    """
+
+    # cell coordinates are packed into one int64 key, 21 bits per axis
+    BITS = 21
+    OFFSET = 1 << (BITS - 1)
+    MASK = (1 << BITS) - 1
+
+    def __init__(self, cellSize: float = 1.0):
+        self.cellSize = cellSize
+        self.positions = np.zeros((0, 3))
+        self.cells = np.zeros((0, 3), dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def packCells(cells: np.ndarray) -> np.ndarray:
+        cells = (cells + SpatialGrid.OFFSET) & SpatialGrid.MASK
+        return (cells[:, 0] << (2 * SpatialGrid.BITS)) | (cells[:, 1] << SpatialGrid.BITS) | cells[:, 2]
+
+    def build(self, positions: np.ndarray, cellSize: float = None):
+        if cellSize is not None:
+            self.cellSize = cellSize
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.cells = np.floor(self.positions / self.cellSize).astype(np.int64)
+
+        keys = SpatialGrid.packCells(self.cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+
+    def queryPairs(self, radius, rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns pairs (i, j), i != j, with drone j not farther than radius[i] from drone i.
+
+        Only drones listed in ``rows`` are queried, all drones by default.
+        """
+        count = len(self.positions)
+        radius = np.broadcast_to(np.asarray(radius, dtype=float), (count,))
+        rows = np.arange(count) if rows is None else np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0 or len(self.keys) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        reach = max(int(np.ceil(radius[rows].max() / self.cellSize)), 1)
+        pairsI, pairsJ = [], []
+        for offset in itertools.product(range(-reach, reach + 1), repeat=3):
+            keys = SpatialGrid.packCells(self.cells[rows] + np.array(offset, dtype=np.int64))
+            slots = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = self.keys[slots] == keys
+            if not np.any(found):
+                continue
+
+            # expand every (drone, cell) match into the drones stored in that cell
+            counts = self.counts[slots[found]]
+            total = counts.sum()
+            firsts = np.repeat(self.starts[slots[found]] - (np.cumsum(counts) - counts), counts)
+            pairsI.append(np.repeat(rows[found], counts))
+            pairsJ.append(self.order[firsts + np.arange(total)])
+
+        if not pairsI:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        i, j = np.concatenate(pairsI), np.concatenate(pairsJ)
+        close = (i != j) & (norm(self.positions[j] - self.positions[i]) <= radius[i])
+        return i[close], j[close]
@@ -0,0 +1,149 @@
+from typing import Final, Optional, Tuple
+
+import numpy as np
+
+from src.SpatialGrid import SpatialGrid, norm
+
+
+def quadraticDependence(k):
+    return k * k - 2 * k + 1
+
+
+class PairTerms:
+    """Per-tick cache of the pairwise terms shared by the Kopt estimation and the repulsion.
+
+    Pair p describes drone ``i[p]`` and its neighbor ``j[p]``, only pairs inside the safe radius are kept.
+    """
+
+    def __init__(self, i: np.ndarray, j: np.ndarray, positions: np.ndarray, velocities: np.ndarray, h: float):
+        self.i = i
+        self.j = j
+        self.diff = positions[j] - positions[i]  # from drone to neighbor
+        self.dist = norm(self.diff)
+
+        after = positions + h * velocities
+        self.distAfter = norm(after[i] - after[j])
+        self.closing = self.dist - self.distAfter
+
+    def __len__(self):
+        return len(self.i)
+
+
+class SwarmPhysics:
+    """Goal/swarm/repulsion model evaluated for the whole swarm at once.
+
+    Drones are stored as a struct of arrays: row i of every array describes drone i.
+    Statuses follow Drone.connected: 0 - disconnected, 1 - on the way, 2 - reached.
+    """
+
+    def __init__(self):
+        self.k1: Final[float] = 2.0  # Target
+        self.k2: Final[float] = 1.0  # Swarm movement
+        self.k3: Final[float] = 2.5  # repulsion
+        self.h: Final[float] = 0.01  # step for predicting approach
+        self.approach: Final[float] = 0.2  # minimal approach of drones in one step
+        self.targetAccuracy: Final[float] = 1
+        self.grid = SpatialGrid()
+
+    def closePairs(self, positions: np.ndarray, safeRadius: np.ndarray, rows: np.ndarray,
+                   neighbors: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # neighbors inside the safe radius for the drones listed in rows
+        if neighbors is None:
+            self.grid.build(positions, max(float(safeRadius.max()), 1e-6))
+            return self.grid.queryPairs(safeRadius, rows)
+
+        diff = positions[None, :, :] - positions[rows, None, :]
+        close = neighbors[rows] & (norm(diff) <= safeRadius[rows, None])
+        i, j = np.nonzero(close)
+        return rows[i], j
+
+    def pairTerms(self, i: np.ndarray, j: np.ndarray, positions: np.ndarray, velocities: np.ndarray) -> PairTerms:
+        return PairTerms(i, j, positions, velocities, self.h)
+
+    def localKopt(self, terms: PairTerms, velocities: np.ndarray, safeRadius: np.ndarray,
+                  criticalRadius: np.ndarray) -> np.ndarray:
+        # DronePhysics.findLocalKopt for every cached pair
+        # speed is taken into account only for moving drones
+        speeds = norm(velocities)
+        moving = np.any(velocities != 0, axis=1)
+        bothMoving = moving[terms.i] & moving[terms.j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed = np.where(bothMoving, terms.closing / (self.h * (speeds[terms.i] + speeds[terms.j])), 0)
+
+        normalizedDist = terms.dist / safeRadius[terms.i]
+        quadraticDist = quadraticDependence(normalizedDist)
+
+        # if the approach of drones is less than 'approach', then the speed will not be taken into account
+        k = np.where(speed < self.approach, quadraticDist, (quadraticDist + speed) / 2)
+        k = np.where(terms.closing <= 0, 0, k)
+        # checking for critical distance of drones
+        return np.where(terms.dist <= criticalRadius[terms.i], self.k3, k)
+
+    def effectiveKopt(self, terms: PairTerms, velocities: np.ndarray, safeRadius: np.ndarray,
+                      criticalRadius: np.ndarray) -> np.ndarray:
+        # DronePhysics.countKeff for every drone: maximum Kopt over the neighbors inside the safe radius
+        keff = np.zeros(len(velocities))
+        np.maximum.at(keff, terms.i, self.localKopt(terms, velocities, safeRadius, criticalRadius))
+        return keff
+
+    def constructVelocities(self, positions, velocities, targets, statuses, safeRadius, criticalRadius,
+                            neighbors: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns velocity commands (n, 3) and updated statuses (n,) for the whole swarm.
+
+        ``neighbors`` is an (n, n) boolean matrix, row i marks the neighbor list of drone i.
+        By default every drone is a neighbor of every other drone and the neighbors inside
+        the safe radius are found with the spatial grid instead of an all-pairs search.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        velocities = np.asarray(velocities, dtype=float).reshape(-1, 3)
+        targets = np.asarray(targets, dtype=float).reshape(-1, 3)
+        count = len(positions)
+        statuses = np.array(statuses, dtype=int).reshape(count)
+        safeRadius = np.broadcast_to(np.asarray(safeRadius, dtype=float), (count,))
+        criticalRadius = np.broadcast_to(np.asarray(criticalRadius, dtype=float), (count,))
+        if neighbors is None:
+            neighborCount = np.full(count, count - 1)
+        else:
+            neighborCount = neighbors.sum(axis=1)
+
+        commands = np.zeros((count, 3))
+
+        # checking for unconnected drones
+        active = (statuses != 0) & (statuses != 2)
+        toTarget = targets - positions
+        targetDist = norm(toTarget)
+        reached = active & (targetDist <= self.targetAccuracy)
+        statuses[reached] = 2  # status 2 means drone has reached his target
+        active &= ~reached
+        if not np.any(active):
+            return commands, statuses
+
+        # pairwise terms and Keff are computed once per tick, only moving drones need their neighborhood
+        i, j = self.closePairs(positions, safeRadius, np.flatnonzero(active), neighbors)
+        terms = self.pairTerms(i, j, positions, velocities)
+        keff = self.effectiveKopt(terms, velocities, safeRadius, criticalRadius)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            V_goal = self.k1 * toTarget / targetDist[:, None]
+
+            origin = norm(positions)
+            arg1 = terms.dist / np.minimum(origin[terms.i], origin[terms.j])
+            weight = -self.k3 * keff[terms.i] * ((2 - arg1) * (2 - arg1)) / terms.dist
+            V_close = np.zeros((count, 3))
+            r_sum = np.zeros((count, 3))
+            for axis in range(3):
+                V_close[:, axis] = np.bincount(terms.i, weight * terms.diff[:, axis], count)
+                r_sum[:, axis] = np.bincount(terms.i, positions[terms.j, axis], count)
+
+            toCenter = r_sum / np.maximum(neighborCount, 1)[:, None] - positions
+            V_swarm = np.where((neighborCount != 0)[:, None], self.k2 * toCenter / norm(toCenter)[:, None], 0)
+
+        # if there are no neighbors in the safety radius
+        V_close[np.all(r_sum == 0, axis=1)] = 0
+
+        result = V_goal + V_close + V_swarm
+        # degenerate geometry (coincident drones, a drone in the frame origin) raised ZeroDivisionError
+        # in the per-Vector implementation, such drones hold their position
+        result[~np.all(np.isfinite(result), axis=1)] = 0
+        commands[active] = result[active]
+        return commands, statuses
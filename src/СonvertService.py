@@ -1,25 +1,107 @@
+import functools
+import math
+
 import numpy as np
 import pyproj
 import scipy.spatial.transform
+from pyproj.enums import TransformDirection
+
+
+class EnuFrame:
+    # local East-North-Up frame with the origin at (lat0, lon0, alt0),
+    # the transformer and the rotation matrix are built once per origin.
+    #
+    # flat=True replaces pyproj with a second order local tangent plane approximation on the WGS84
+    # radii of curvature of the origin. Compared with the exact conversion the error stays below
+    # 1 mm within 1 km of the origin and below 0.1 m within 10 km (up to 75 degrees of latitude),
+    # growing with the cube of the distance further away.
+
+    WGS84_A = 6378137.0
+    WGS84_F = 1 / 298.257223563
+    WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+    def __init__(self, lat0, lon0, alt0, flat=False):
+        self.origin = (lat0, lon0, alt0)
+        self.flat = flat
+        self.transformer = ConvertService.transformer()
+        self.originEcef = np.array(self.transformer.transform(lon0, lat0, alt0, radians=False))
+
+        rot1 = scipy.spatial.transform.Rotation.from_euler('x', -(90 - lat0),
+                                                           degrees=True).as_matrix()  # angle*-1 : left handed *-1
+        rot3 = scipy.spatial.transform.Rotation.from_euler('z', -(90 + lon0),
+                                                           degrees=True).as_matrix()  # angle*-1 : left handed *-1
+        self.rotation = rot1.dot(rot3)
+
+        # meridian and prime vertical radii of curvature in the origin
+        self.sinLat, self.cosLat = math.sin(math.radians(lat0)), math.cos(math.radians(lat0))
+        w = 1 - EnuFrame.WGS84_E2 * self.sinLat * self.sinLat
+        self.meridianRadius = EnuFrame.WGS84_A * (1 - EnuFrame.WGS84_E2) / (w * math.sqrt(w))
+        self.normalRadius = EnuFrame.WGS84_A / math.sqrt(w)
+
+    def toEnu(self, lat, lon, alt) -> np.ndarray:
+        # scalars give one (3,) point, arrays of n points give (n, 3)
+        if self.flat:
+            return self.toEnuFlat(lat, lon, alt)
+        x, y, z = self.transformer.transform(lon, lat, alt, radians=False)
+        ecef = np.stack((x, y, z), axis=-1) - self.originEcef
+        return ecef.dot(self.rotation.T)
+
+    def toGeodetic(self, east, north, up):
+        # returns (lat, lon, alt), scalars or arrays as given
+        if self.flat:
+            return self.toGeodeticFlat(east, north, up)
+        enu = np.stack(np.broadcast_arrays(east, north, up), axis=-1)
+        x, y, z = (enu.dot(self.rotation) + self.originEcef).T
+        lon, lat, alt = self.transformer.transform(x, y, z, radians=False, direction=TransformDirection.INVERSE)
+        return lat, lon, alt
+
+    def toEnuFlat(self, lat, lon, alt) -> np.ndarray:
+        lat0, lon0, alt0 = self.origin
+        dLat = np.radians(np.asarray(lat, dtype=float) - lat0)
+        dLon = np.radians(np.asarray(lon, dtype=float) - lon0)
+        alt = np.asarray(alt, dtype=float)
+        meridian, normal = self.meridianRadius + alt, self.normalRadius + alt
+
+        east = normal * self.cosLat * dLon - meridian * self.sinLat * dLat * dLon
+        north = meridian * dLat + normal * self.sinLat * self.cosLat * dLon * dLon / 2
+        up = alt - alt0 - east * east / (2 * self.normalRadius) - north * north / (2 * self.meridianRadius)
+        return np.stack(np.broadcast_arrays(east, north, up), axis=-1)
+
+    def toGeodeticFlat(self, east, north, up):
+        lat0, lon0, alt0 = self.origin
+        east, north = np.asarray(east, dtype=float), np.asarray(north, dtype=float)
+        alt = np.asarray(up, dtype=float) + alt0 + east * east / (2 * self.normalRadius) \
+            + north * north / (2 * self.meridianRadius)
+        meridian, normal = self.meridianRadius + alt, self.normalRadius + alt
+
+        # inverse of the second order terms, converges in a couple of iterations
+        dLat = north / meridian
+        dLon = east / (normal * self.cosLat)
+        for _ in range(2):
+            dLat = (north - normal * self.sinLat * self.cosLat * dLon * dLon / 2) / meridian
+            dLon = east / (normal * self.cosLat - meridian * self.sinLat * dLat)
+        return lat0 + np.degrees(dLat), lon0 + np.degrees(dLon), alt
 
 
 class ConvertService:
 
     @staticmethod
-    def geodetic2enu(lat, lon, alt, lat_org, lon_org, alt_org):
-        transformer = pyproj.Transformer.from_crs(
+    @functools.lru_cache(maxsize=None)
+    def transformer() -> pyproj.Transformer:
+        return pyproj.Transformer.from_crs(
             {"proj": 'latlong', "ellps": 'WGS84', "datum": 'WGS84'},
             {"proj": 'geocent', "ellps": 'WGS84', "datum": 'WGS84'},
         )
-        x, y, z = transformer.transform(lon, lat, alt, radians=False)
-        x_org, y_org, z_org = transformer.transform(lon_org, lat_org, alt_org, radians=False)
-        vec = np.array([[x - x_org, y - y_org, z - z_org]]).T
 
-        rot1 = scipy.spatial.transform.Rotation.from_euler('x', -(90 - lat_org),
-                                                           degrees=True).as_matrix()  # angle*-1 : left handed *-1
-        rot3 = scipy.spatial.transform.Rotation.from_euler('z', -(90 + lon_org),
-                                                           degrees=True).as_matrix()  # angle*-1 : left handed *-1
-        rotation_matrix = rot1.dot(rot3)
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def frame(lat_org, lon_org, alt_org) -> EnuFrame:
+        return EnuFrame(lat_org, lon_org, alt_org)
 
-        enu = rotation_matrix.dot(vec).T.ravel()
-        return enu.T
+    @staticmethod
+    def geodetic2enu(lat, lon, alt, lat_org, lon_org, alt_org):
+        return ConvertService.frame(lat_org, lon_org, alt_org).toEnu(lat, lon, alt)
+
+    @staticmethod
+    def enu2geodetic(east, north, up, lat_org, lon_org, alt_org):
+        return ConvertService.frame(lat_org, lon_org, alt_org).toGeodetic(east, north, up)